@@ -26,6 +26,7 @@ from app.config.app_config import (
     BACKUP_RETENTION_DAYS,
     DATABASE_URL,
 )
+from app.services.document_service import DocumentService
 
 logger = logging.getLogger(__name__)
 
@@ -228,6 +229,9 @@ class BackupService:
         """
         start_time = time.time()
 
+        # Make sure cached document metadata is on disk before copying
+        await DocumentService.flush_metadata()
+
         # Create backup directory
         backup_path = os.path.join(self.backup_dir, "user_data", backup_id)
         os.makedirs(backup_path, exist_ok=True)
@@ -694,9 +698,15 @@ class BackupService:
                 # Create user directory if it doesn't exist
                 os.makedirs(user_dir, exist_ok=True)
 
+                # Stop pending metadata flushes from writing over the restore
+                await DocumentService.drop_cached_metadata(user_id)
+
                 # Copy user data
                 size = await self._copy_directory(user_backup_dir, user_dir)
 
+                # The restored metadata file replaces anything cached meanwhile
+                await DocumentService.drop_cached_metadata(user_id)
+
                 user_results[user_id] = {
                     "status": "success",
                     "size_bytes": size,
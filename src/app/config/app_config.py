@@ -59,3 +59,8 @@ CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 GRAPH_TRAVERSAL_DEPTH = int(os.getenv("GRAPH_TRAVERSAL_DEPTH", "3"))
 CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
 CACHE_SIZE = int(os.getenv("CACHE_SIZE", "1000"))  # Number of items to cache
+# Also reuse results of reworded queries, matched by embedding similarity.
+# Costs one extra embedding call for every query not cached word for word
+SEMANTIC_CACHE_ENABLED = (
+    os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+)
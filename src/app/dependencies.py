@@ -1,6 +1,7 @@
 from fastapi import Request, Depends
 from lightrag import LightRAG
 import logging
+from typing import AsyncIterator
 
 from app.middleware.auth import validate_token
 from app.services.rag_manager import get_rag_manager
@@ -10,18 +11,20 @@ logger = logging.getLogger(__name__)
 
 async def get_rag_for_user(
     request: Request, user_id: str = Depends(validate_token)
-) -> LightRAG:
+) -> AsyncIterator[LightRAG]:
     """
     Dependency for retrieving a user-specific LightRAG instance
 
     This function is used with FastAPI's dependency injection system to
-    provide a LightRAG instance for the authenticated user.
+    provide a LightRAG instance for the authenticated user. The instance is
+    kept from eviction until the route handler returns, so queries and graph
+    operations never run on an instance the manager has dropped.
 
     Args:
         request: The FastAPI request object
         user_id: The authenticated user ID (from validate_token dependency)
 
-    Returns:
+    Yields:
         A LightRAG instance for the user
     """
     logger.info(f"Getting LightRAG instance for user {user_id}")
@@ -29,7 +32,6 @@ async def get_rag_for_user(
     # Get the RAG instance manager
     rag_manager = get_rag_manager()
 
-    # Get the LightRAG instance for this user
-    rag = rag_manager.get_instance(user_id)
-
-    return rag
+    # Get the LightRAG instance for this user, pinned for the request
+    with rag_manager.in_use(user_id):
+        yield await rag_manager.aget_instance(user_id)
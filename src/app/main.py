@@ -1,4 +1,6 @@
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+import asyncio
 import logging
 from app.config.app_config import (
     DATABASE_URL,
@@ -12,6 +14,9 @@ from app.services.datasource_registry import datasource_registry
 from app.monitoring.system_monitor import SystemMonitor
 from app.monitoring.lightrag_monitor import get_lightrag_monitor
 from app.backup.backup_service import get_backup_service
+from app.services.document_service import DocumentService
+from app.services.rag_manager import get_rag_manager
+from app.utilities.auth import close_http_client
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +30,8 @@ app = FastAPI(
     title="EmbedIQ Backend API",
     description="LightRAG-powered backend for the EmbedIQ application",
     version="0.1.0",
+    # Serialize responses with orjson rather than the stdlib encoder
+    default_response_class=ORJSONResponse,
 )
 
 # Include routers
@@ -35,6 +42,16 @@ app.include_router(api_router)
 async def startup_event():
     """Execute tasks on application startup"""
     logger.info("Starting EmbedIQ Backend API")
+
+    # The API is I/O bound end to end, so it should run on uvloop in deployment
+    loop_type = type(asyncio.get_running_loop())
+    if loop_type.__module__.startswith("uvloop"):
+        logger.info("Event loop: uvloop")
+    else:
+        logger.warning(
+            f"Event loop: {loop_type.__module__}.{loop_type.__name__} "
+            "(install uvloop and run uvicorn with --loop uvloop for better throughput)"
+        )
     logger.info(f"Database URL: {DATABASE_URL.replace('devpassword', '****')}")
 
     # Use a local data directory for development when not in Docker
@@ -73,6 +90,18 @@ async def shutdown_event():
     """Execute tasks on application shutdown"""
     logger.info("Shutting down EmbedIQ Backend API")
 
+    # Finish queued ingestion, which updates document metadata
+    await DocumentService.stop_ingestion()
+
+    # Write any pending document metadata changes to disk
+    await DocumentService.flush_metadata()
+
+    # Stop the idle RAG instance sweeper and in-flight embedding requests
+    await get_rag_manager().stop()
+
+    # Close the connection used to fetch Auth0 keys
+    await close_http_client()
+
     # Stop backup scheduler
     if BACKUP_ENABLED:
         logger.info("Stopping backup scheduler")
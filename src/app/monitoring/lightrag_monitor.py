@@ -17,6 +17,47 @@ from functools import wraps
 
 logger = logging.getLogger(__name__)
 
+# LightRAG's PostgreSQL storages share one connection pool per process
+try:
+    from lightrag.kg.postgres_impl import ClientManager
+except ImportError:
+    ClientManager = None
+
+
+def get_postgres_pool_metrics() -> Optional[Dict[str, int]]:
+    """
+    Get the usage of the PostgreSQL connection pool shared by LightRAG storages.
+
+    LightRAG has no public accessor for the pool, so it is read from
+    ClientManager's registry defensively; a LightRAG version that changes it
+    makes this report nothing rather than fail the metrics request.
+
+    The pool's size is not tuned here: LightRAG fixes it at 12 connections
+    with no setting to change it.
+
+    Returns:
+        Dictionary with pool size, idle and in-use connection counts and
+        limits, or None if no pool has been created
+    """
+    instances = getattr(ClientManager, "_instances", None)
+    if not isinstance(instances, dict):
+        return None
+
+    pool = getattr(instances.get("db"), "pool", None)
+    if pool is None:
+        return None
+
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    return {
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+        "clients": instances.get("ref_count", 0),
+    }
+
 
 class LightRAGMonitor:
     """
@@ -120,6 +161,7 @@ class LightRAGMonitor:
                 "query": query_metrics,
                 "search": search_metrics,
                 "insert": insert_metrics,
+                "postgres_pool": get_postgres_pool_metrics(),
             }
 
             return metrics
@@ -13,8 +13,9 @@ from fastapi import (
     Query,
     Path,
 )
-from fastapi.responses import JSONResponse
-from typing import List, Optional, Dict, Any
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from typing import List, Optional, Dict, Any, AsyncIterator
 from uuid import UUID
 import logging
 
@@ -30,10 +31,39 @@ from app.models.documents import (
 )
 from app.services.document_service import DocumentService
 
+logger = logging.getLogger(__name__)
+
 # Create documents router - remove the prefix since api_router already has it
 documents_router = APIRouter(tags=["documents"])
 
 
+async def _stream_document_list(
+    documents: AsyncIterator[Dict[str, Any]],
+) -> AsyncIterator[bytes]:
+    """
+    Serialize documents as a DocumentList JSON body, one document at a time
+
+    Args:
+        documents: Document metadata to serialize
+
+    Yields:
+        Chunks of the JSON response body
+    """
+    total = 0
+    yield b'{"documents":['
+    async for doc in documents:
+        try:
+            row = DocumentResponse.model_validate(doc).model_dump_json()
+        except ValidationError as e:
+            # Headers are already sent, so a bad row can't fail the response
+            logger.error(f"Skipping document {doc.get('id')} in listing: {e}")
+            continue
+
+        yield (b"," if total else b"") + row.encode()
+        total += 1
+    yield b'],"total":%d}' % total
+
+
 @documents_router.post(
     "",
     response_model=DocumentResponse,
@@ -102,19 +132,21 @@ async def list_documents(
     This endpoint lists all documents owned by the authenticated user.
     The results can be filtered by status or tag.
     """
-    documents = await DocumentService.get_documents(user_id)
+    documents = DocumentService.iter_documents(user_id)
 
     # Apply filters if needed
-    if status_filter:
-        documents = [doc for doc in documents if doc.get("status") == status_filter]
+    if status_filter or tag:
+        documents = (
+            doc
+            async for doc in documents
+            if (not status_filter or doc.get("status") == status_filter)
+            and (not tag or tag in doc.get("tags", []))
+        )
 
-    if tag:
-        documents = [doc for doc in documents if tag in doc.get("tags", [])]
-
-    return {
-        "documents": documents,
-        "total": len(documents),
-    }
+    # Stream the list so large libraries aren't built up in memory twice
+    return StreamingResponse(
+        _stream_document_list(documents), media_type="application/json"
+    )
 
 
 @documents_router.get(
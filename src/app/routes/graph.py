@@ -13,10 +13,12 @@ from fastapi import (
     Response,
     Body,
 )
-from typing import List, Optional, Dict, Any, Type, Callable
+from typing import List, Optional, Dict, Any, AsyncIterator, Type, Callable
 from uuid import UUID
+import asyncio
 import logging
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
 
 from app.middleware.auth import validate_token
 from app.models.graph import (
@@ -59,6 +61,90 @@ def service_factory(service_class: Type) -> Callable:
 # Get the current graph service using the factory
 get_graph_service = service_factory(GraphService)
 
+# Size at which buffered response chunks are flushed to the client
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# Number of elements validated between yields to the event loop
+VALIDATE_BATCH_SIZE = 1000
+
+# Response element models, in the order they appear in a GraphResponse body
+GRAPH_ELEMENTS = (("nodes", GraphNode), ("edges", GraphEdge))
+
+
+async def _validate_graph(result: Dict[str, Any]) -> None:
+    """
+    Check every element of a subgraph before any of it is sent
+
+    Elements are validated one at a time and not kept, so validation never
+    holds a second copy of the graph.
+
+    Args:
+        result: Subgraph with nodes and edges
+
+    Raises:
+        HTTPException: If an element doesn't match the response schema
+    """
+    try:
+        for key, model in GRAPH_ELEMENTS:
+            for index, element in enumerate(result.get(key, []), 1):
+                model.model_validate(element)
+                if index % VALIDATE_BATCH_SIZE == 0:
+                    await asyncio.sleep(0)
+    except ValidationError as e:
+        logger.error(f"Malformed graph element in response: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error serializing graph response",
+        )
+
+
+async def _stream_graph(result: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """
+    Serialize a validated subgraph as a GraphResponse JSON body in chunks
+
+    Each element is converted to its response model and serialized on its
+    own, so only one model and one buffered chunk exist at a time.
+
+    Args:
+        result: Subgraph with nodes and edges, checked by _validate_graph
+
+    Yields:
+        Chunks of the JSON response body
+    """
+    buffer = bytearray(b"{")
+    totals = {}
+
+    for key, model in GRAPH_ELEMENTS:
+        buffer += b'"%s":[' % key.encode()
+
+        elements = result.get(key, [])
+        for index, element in enumerate(elements):
+            if index:
+                buffer += b","
+            buffer += model.model_validate(element).model_dump_json().encode()
+
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+                # Serializing is CPU-bound, let other requests run between chunks
+                await asyncio.sleep(0)
+
+        buffer += b"],"
+        totals[key] = len(elements)
+
+    buffer += b'"total_nodes":%d,"total_edges":%d}' % (
+        totals["nodes"],
+        totals["edges"],
+    )
+    yield bytes(buffer)
+
+
+async def _graph_response(result: Dict[str, Any]) -> StreamingResponse:
+    """Validate a subgraph result and stream it as a GraphResponse body"""
+    await _validate_graph(result)
+    return StreamingResponse(_stream_graph(result), media_type="application/json")
+
 
 @graph_router.get(
     "",
@@ -75,6 +161,7 @@ async def get_graph(
     node_labels: Optional[List[str]] = Query(None, description="Filter by node labels"),
     edge_types: Optional[List[str]] = Query(None, description="Filter by edge types"),
     graph_service: GraphService = Depends(get_graph_service),
+    rag=Depends(get_rag_for_user),
     user_id: str = Depends(validate_token),
 ):
     """
@@ -93,10 +180,16 @@ async def get_graph(
     if limit > 500:
         limit = 500
 
-    return await graph_service.get_graph(
-        limit=limit, offset=offset, node_labels=node_labels, edge_types=edge_types
+    result = await graph_service.get_graph(
+        rag=rag,
+        limit=limit,
+        offset=offset,
+        node_labels=node_labels,
+        edge_types=edge_types,
     )
 
+    return await _graph_response(result)
+
 
 # This endpoint aligns with LightRAG's API, which provides a /graphs endpoint
 # that takes a label and max_depth parameter to get a knowledge graph.
@@ -127,11 +220,13 @@ async def get_knowledge_graph(
         graph = await rag.get_knowledge_graph(node_label=label, max_depth=max_depth)
 
         # Format the response
+        nodes = graph.get("nodes") or []
+        edges = graph.get("edges") or []
         return {
-            "nodes": graph.get("nodes", []),
-            "edges": graph.get("edges", []),
-            "total_nodes": len(graph.get("nodes", [])),
-            "total_edges": len(graph.get("edges", [])),
+            "nodes": nodes,
+            "edges": edges,
+            "total_nodes": len(nodes),
+            "total_edges": len(edges),
         }
     except Exception as e:
         logger.error(f"Error getting knowledge graph: {str(e)}")
@@ -355,7 +450,7 @@ async def traverse_graph(
         limit=traversal.limit,
     )
 
-    return result
+    return await _graph_response(result)
 
 
 @graph_router.post(
@@ -412,7 +507,7 @@ async def search_graph(
         offset=search_request.offset,
     )
 
-    return result
+    return await _graph_response(result)
 
 
 @graph_router.get(
@@ -467,8 +562,8 @@ async def get_visualization_data(
         format=format.value,
     )
 
-    # Return with appropriate content type
+    # Serialize with orjson; large graphs are slow through the stdlib encoder
     if format == VisualizationFormatEnum.JSONLD:
-        return Response(content=str(viz_data), media_type="application/ld+json")
+        return ORJSONResponse(content=viz_data, media_type="application/ld+json")
 
-    return viz_data
+    return ORJSONResponse(content=viz_data)
@@ -5,12 +5,35 @@ Service for validating data source configurations.
 import os
 import logging
 import asyncio
-from typing import Dict, Any, Optional, Union
+import base64
+import hashlib
+import time
+from typing import Dict, Any, Optional, Tuple, Union
 import httpx
 import csv
-import json
+import io
+import orjson
 import sqlite3
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, closing
+from functools import lru_cache
+
+# Optional drivers are imported once here; None means the driver is not installed
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+try:
+    import mysql.connector
+except ImportError:
+    mysql = None
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+    ClientError = None
 
 from app.models.datasources import (
     DataSourceConfig,
@@ -26,6 +49,92 @@ logger = logging.getLogger(__name__)
 # Timeout for validation operations (in seconds)
 VALIDATION_TIMEOUT = 10
 
+# Maximum number of bytes read when sampling a CSV file (1 MB)
+FILE_SAMPLE_SIZE = 1 << 20
+
+# Validator method names keyed by data source model class
+_VALIDATORS = {
+    DatabaseDataSource: "validate_database_connection",
+    FileDataSource: "validate_file_access",
+    APIDataSource: "validate_api_endpoint",
+    S3DataSource: "validate_s3_access",
+}
+
+# How long a successful S3 bucket existence check is trusted (in seconds)
+S3_BUCKET_CACHE_TTL = 300
+
+# Maximum number of bucket/credential combinations remembered
+S3_BUCKET_CACHE_SIZE = 1024
+
+# Expiry times of successful head_bucket checks, keyed by (bucket, credentials hash)
+_S3_BUCKET_CACHE: Dict[Tuple[str, str], float] = {}
+
+
+def _s3_bucket_cache_key(config: S3DataSource, secret_key: Optional[str]) -> Tuple[str, str]:
+    """Build the bucket-existence cache key without keeping credentials in memory"""
+    credentials = f"{config.access_key or ''}:{secret_key or ''}:{config.region}"
+    return config.bucket, hashlib.sha1(credentials.encode()).hexdigest()
+
+
+def _s3_bucket_known(cache_key: Tuple[str, str]) -> bool:
+    """Check whether a bucket was confirmed accessible within the cache TTL"""
+    expires_at = _S3_BUCKET_CACHE.get(cache_key)
+    if expires_at is None:
+        return False
+    if expires_at <= time.monotonic():
+        _S3_BUCKET_CACHE.pop(cache_key, None)
+        return False
+    return True
+
+
+def _remember_s3_bucket(cache_key: Tuple[str, str]) -> None:
+    """Record a successful bucket check, dropping expired and excess entries"""
+    now = time.monotonic()
+    _S3_BUCKET_CACHE.pop(cache_key, None)
+    _S3_BUCKET_CACHE[cache_key] = now + S3_BUCKET_CACHE_TTL
+
+    # Every entry has the same TTL, so insertion order is also expiry order
+    while _S3_BUCKET_CACHE and (
+        len(_S3_BUCKET_CACHE) > S3_BUCKET_CACHE_SIZE
+        or next(iter(_S3_BUCKET_CACHE.values())) <= now
+    ):
+        del _S3_BUCKET_CACHE[next(iter(_S3_BUCKET_CACHE))]
+
+
+@lru_cache(maxsize=256)
+def _basic_auth_header(username: str, password: str) -> str:
+    """Build (and memoize) the Authorization header value for basic auth"""
+    encoded_auth = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return f"Basic {encoded_auth}"
+
+
+def _pread_file(path: str, size: Optional[int] = None) -> bytes:
+    """
+    Read up to ``size`` bytes from the start of a file (the whole file if None)
+    
+    Meant to be run in a worker thread so the event loop is never blocked.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if size is None:
+            size = os.fstat(fd).st_size
+            
+        # Hint the kernel to read ahead aggressively (Linux only)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_SEQUENTIAL)
+            
+        chunks = []
+        offset = 0
+        while offset < size:
+            chunk = os.pread(fd, size - offset, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
 
 class DataSourceValidationService:
     """Service for validating data source configurations"""
@@ -43,20 +152,22 @@ class DataSourceValidationService:
         """
         try:
             # Validate based on data source type
-            if isinstance(config, DatabaseDataSource):
-                return await DataSourceValidationService.validate_database_connection(config)
-            elif isinstance(config, FileDataSource):
-                return await DataSourceValidationService.validate_file_access(config)
-            elif isinstance(config, APIDataSource):
-                return await DataSourceValidationService.validate_api_endpoint(config)
-            elif isinstance(config, S3DataSource):
-                return await DataSourceValidationService.validate_s3_access(config)
-            else:
+            handler = _VALIDATORS.get(type(config))
+            if handler is None:
+                # Fall back to the MRO so subclasses of the built-in models still dispatch
+                handler = next(
+                    (_VALIDATORS[cls] for cls in type(config).__mro__ if cls in _VALIDATORS),
+                    None,
+                )
+                
+            if handler is None:
                 return ValidationResult(
                     success=False,
                     message=f"Unsupported data source type: {config.type}",
                     details={"type": config.type},
                 )
+                
+            return await getattr(DataSourceValidationService, handler)(config)
         except Exception as e:
             logger.error(f"Error validating data source: {str(e)}")
             return ValidationResult(
@@ -131,13 +242,9 @@ class DataSourceValidationService:
         if config.type == "sqlite":
             return await DataSourceValidationService._validate_sqlite_connection(config)
             
-        # For PostgreSQL and MySQL, we need to import the appropriate libraries
-        # We import them here to avoid unnecessary dependencies if not used
+        # PostgreSQL and MySQL drivers are optional dependencies
         if config.type == "postgres":
-            try:
-                import psycopg2
-                from psycopg2 import sql
-            except ImportError:
+            if psycopg2 is None:
                 return {
                     "success": False,
                     "message": "PostgreSQL driver (psycopg2) not installed",
@@ -162,35 +269,31 @@ class DataSourceValidationService:
                 conn_string += f"/{config.database}"
                 
             try:
-                # Connect to the database
-                conn = psycopg2.connect(conn_string)
-                cursor = conn.cursor()
-                
-                # Test a simple query
-                cursor.execute("SELECT 1")
-                result = cursor.fetchone()
-                
-                # Check if we got the expected result
-                if result and result[0] == 1:
-                    # Test table listing to check permissions
-                    cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
-                    tables = cursor.fetchall()
+                # Connect to the database; the connection is closed on every exit path
+                with closing(psycopg2.connect(conn_string)) as conn, conn.cursor() as cursor:
+                    # Test a simple query
+                    cursor.execute("SELECT 1")
+                    result = cursor.fetchone()
                     
-                    conn.close()
-                    return {
-                        "success": True,
-                        "message": "Successfully connected to PostgreSQL database",
-                        "details": {
-                            "tables_count": len(tables),
-                            "tables": [table[0] for table in tables[:5]],  # Show first 5 tables
-                        },
-                    }
-                else:
-                    conn.close()
-                    return {
-                        "success": False,
-                        "message": "Connected to PostgreSQL database but test query failed",
-                    }
+                    # Check if we got the expected result
+                    if result and result[0] == 1:
+                        # Test table listing to check permissions
+                        cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
+                        tables = cursor.fetchall()
+                        
+                        return {
+                            "success": True,
+                            "message": "Successfully connected to PostgreSQL database",
+                            "details": {
+                                "tables_count": len(tables),
+                                "tables": [table[0] for table in tables[:5]],  # Show first 5 tables
+                            },
+                        }
+                    else:
+                        return {
+                            "success": False,
+                            "message": "Connected to PostgreSQL database but test query failed",
+                        }
             except Exception as e:
                 return {
                     "success": False,
@@ -198,9 +301,7 @@ class DataSourceValidationService:
                 }
                 
         elif config.type == "mysql":
-            try:
-                import mysql.connector
-            except ImportError:
+            if mysql is None:
                 return {
                     "success": False,
                     "message": "MySQL driver (mysql-connector-python) not installed",
@@ -262,35 +363,31 @@ class DataSourceValidationService:
                         else:
                             conn_params["password"] = config.password
                 
-                # Connect to the database
-                conn = mysql.connector.connect(**conn_params)
-                cursor = conn.cursor()
-                
-                # Test a simple query
-                cursor.execute("SELECT 1")
-                result = cursor.fetchone()
-                
-                # Check if we got the expected result
-                if result and result[0] == 1:
-                    # Test table listing to check permissions
-                    cursor.execute("SHOW TABLES")
-                    tables = cursor.fetchall()
+                # Connect to the database; the connection is closed on every exit path
+                with closing(mysql.connector.connect(**conn_params)) as conn, closing(conn.cursor()) as cursor:
+                    # Test a simple query
+                    cursor.execute("SELECT 1")
+                    result = cursor.fetchone()
                     
-                    conn.close()
-                    return {
-                        "success": True,
-                        "message": "Successfully connected to MySQL database",
-                        "details": {
-                            "tables_count": len(tables),
-                            "tables": [table[0] for table in tables[:5]],  # Show first 5 tables
-                        },
-                    }
-                else:
-                    conn.close()
-                    return {
-                        "success": False,
-                        "message": "Connected to MySQL database but test query failed",
-                    }
+                    # Check if we got the expected result
+                    if result and result[0] == 1:
+                        # Test table listing to check permissions
+                        cursor.execute("SHOW TABLES")
+                        tables = cursor.fetchall()
+                        
+                        return {
+                            "success": True,
+                            "message": "Successfully connected to MySQL database",
+                            "details": {
+                                "tables_count": len(tables),
+                                "tables": [table[0] for table in tables[:5]],  # Show first 5 tables
+                            },
+                        }
+                    else:
+                        return {
+                            "success": False,
+                            "message": "Connected to MySQL database but test query failed",
+                        }
             except Exception as e:
                 return {
                     "success": False,
@@ -336,35 +433,31 @@ class DataSourceValidationService:
                     "message": f"SQLite database file is not readable: {db_path}",
                 }
                 
-            # Try to connect to the database
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            # Test a simple query
-            cursor.execute("SELECT 1")
-            result = cursor.fetchone()
-            
-            # Check if we got the expected result
-            if result and result[0] == 1:
-                # Get table list
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = cursor.fetchall()
+            # Try to connect to the database; the connection is closed on every exit path
+            with closing(sqlite3.connect(db_path)) as conn, closing(conn.cursor()) as cursor:
+                # Test a simple query
+                cursor.execute("SELECT 1")
+                result = cursor.fetchone()
                 
-                conn.close()
-                return {
-                    "success": True,
-                    "message": "Successfully connected to SQLite database",
-                    "details": {
-                        "tables_count": len(tables),
-                        "tables": [table[0] for table in tables[:5]],  # Show first 5 tables
-                    },
-                }
-            else:
-                conn.close()
-                return {
-                    "success": False,
-                    "message": "Connected to SQLite database but test query failed",
-                }
+                # Check if we got the expected result
+                if result and result[0] == 1:
+                    # Get table list
+                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                    tables = cursor.fetchall()
+                    
+                    return {
+                        "success": True,
+                        "message": "Successfully connected to SQLite database",
+                        "details": {
+                            "tables_count": len(tables),
+                            "tables": [table[0] for table in tables[:5]],  # Show first 5 tables
+                        },
+                    }
+                else:
+                    return {
+                        "success": False,
+                        "message": "Connected to SQLite database but test query failed",
+                    }
         except Exception as e:
             return {
                 "success": False,
@@ -406,51 +499,65 @@ class DataSourceValidationService:
                 
             # Validate based on file type
             if config.type == "csv":
-                # Try to read the CSV file
-                with open(config.path, "r", encoding=config.encoding) as f:
-                    # Read the first few lines
-                    reader = csv.reader(f, delimiter=config.delimiter)
-                    
-                    # Get header if available
-                    header = next(reader) if config.has_header else None
-                    
-                    # Read a few rows
-                    rows = []
-                    for i, row in enumerate(reader):
-                        if i >= 5:  # Read up to 5 rows
-                            break
-                        rows.append(row)
+                # Read a bounded sample of the CSV file off the event loop
+                data = await asyncio.to_thread(_pread_file, config.path, FILE_SAMPLE_SIZE)
+                
+                # Drop the trailing partial line if the sample was truncated
+                if len(data) == FILE_SAMPLE_SIZE:
+                    last_newline = data.rfind(b"\n")
+                    if last_newline != -1:
+                        data = data[:last_newline + 1]
                         
-                    details["header"] = header
-                    details["sample_rows"] = rows
-                    details["row_count"] = i + 1
+                sample = io.StringIO(data.decode(config.encoding, errors="replace"), newline="")
+                
+                # Read the first few lines
+                reader = csv.reader(sample, delimiter=config.delimiter)
+                
+                # Get header if available
+                header = next(reader) if config.has_header else None
+                
+                # Read a few rows
+                rows = []
+                for i, row in enumerate(reader):
+                    if i >= 5:  # Read up to 5 rows
+                        break
+                    rows.append(row)
                     
-                    return ValidationResult(
-                        success=True,
-                        message=f"Successfully validated CSV file with {i + 1} rows",
-                        details=details,
-                        warnings=warnings,
-                    )
+                details["header"] = header
+                details["sample_rows"] = rows
+                details["row_count"] = i + 1
+                
+                return ValidationResult(
+                    success=True,
+                    message=f"Successfully validated CSV file with {i + 1} rows",
+                    details=details,
+                    warnings=warnings,
+                )
             elif config.type == "json":
-                # Try to parse the JSON file
-                with open(config.path, "r", encoding=config.encoding) as f:
-                    data = json.load(f)
+                # Try to parse the JSON file off the event loop; a document can only
+                # be validated as a whole, so it is read in full
+                raw = await asyncio.to_thread(_pread_file, config.path)
+                
+                # orjson only accepts UTF-8 bytes, so decode other encodings first
+                if config.encoding and config.encoding.lower().replace("-", "") != "utf8":
+                    raw = raw.decode(config.encoding)
+                data = orjson.loads(raw)
+                
+                # Determine the structure
+                if isinstance(data, list):
+                    details["structure"] = "array"
+                    details["items_count"] = len(data)
+                    details["sample_item"] = data[0] if data else None
+                elif isinstance(data, dict):
+                    details["structure"] = "object"
+                    details["keys"] = list(data.keys())
                     
-                    # Determine the structure
-                    if isinstance(data, list):
-                        details["structure"] = "array"
-                        details["items_count"] = len(data)
-                        details["sample_item"] = data[0] if data else None
-                    elif isinstance(data, dict):
-                        details["structure"] = "object"
-                        details["keys"] = list(data.keys())
-                        
-                    return ValidationResult(
-                        success=True,
-                        message="Successfully validated JSON file",
-                        details=details,
-                        warnings=warnings,
-                    )
+                return ValidationResult(
+                    success=True,
+                    message="Successfully validated JSON file",
+                    details=details,
+                    warnings=warnings,
+                )
             else:
                 # For other file types, just check if it's readable
                 return ValidationResult(
@@ -536,17 +643,13 @@ class DataSourceValidationService:
         # Add authentication headers if needed
         if config.auth_type == "basic":
             if config.auth_username and config.auth_password:
-                import base64
-                
                 # Get password value
                 password = config.auth_password
                 if hasattr(password, "get_secret_value"):
                     password = password.get_secret_value()
                     
                 # Create basic auth header
-                auth_string = f"{config.auth_username}:{password}"
-                encoded_auth = base64.b64encode(auth_string.encode()).decode()
-                headers["Authorization"] = f"Basic {encoded_auth}"
+                headers["Authorization"] = _basic_auth_header(config.auth_username, password)
         elif config.auth_type == "bearer":
             if config.auth_token:
                 # Get token value
@@ -608,7 +711,7 @@ class DataSourceValidationService:
                     
                     if config.response_format == "json":
                         try:
-                            response_data = response.json()
+                            response_data = orjson.loads(response.content)
                             response_details["response_type"] = "json"
                             
                             # Add sample of response data
@@ -665,11 +768,8 @@ class DataSourceValidationService:
         details = {"bucket": config.bucket, "region": config.region}
         
         try:
-            # Try to import boto3
-            try:
-                import boto3
-                from botocore.exceptions import ClientError
-            except ImportError:
+            # boto3 is an optional dependency
+            if boto3 is None:
                 return ValidationResult(
                     success=False,
                     message="AWS SDK (boto3) not installed",
@@ -679,6 +779,7 @@ class DataSourceValidationService:
                 
             # Create S3 client
             s3_kwargs = {"region_name": config.region}
+            secret_key = None
             
             if not config.use_instance_profile:
                 # Use provided credentials
@@ -698,15 +799,23 @@ class DataSourceValidationService:
             
             # Check if bucket exists and is accessible
             try:
-                # List objects with prefix to check access
-                response = s3.list_objects_v2(
+                # A HEAD on the bucket is a single cheap round trip; successful
+                # checks are cached per bucket and credentials
+                cache_key = _s3_bucket_cache_key(config, secret_key)
+                if not _s3_bucket_known(cache_key):
+                    await asyncio.to_thread(s3.head_bucket, Bucket=config.bucket)
+                    _remember_s3_bucket(cache_key)
+                    
+                # Only fetch a single key to confirm list access under the prefix
+                response = await asyncio.to_thread(
+                    s3.list_objects_v2,
                     Bucket=config.bucket,
                     Prefix=config.prefix,
-                    MaxKeys=5,
+                    MaxKeys=1,
                 )
                 
-                # Get object count
-                object_count = response.get("KeyCount", 0)
+                # A single key is enough to tell whether the prefix is empty
+                object_count = ">=1" if response.get("KeyCount", 0) else "0"
                 
                 # Get sample objects
                 objects = []
@@ -4,22 +4,28 @@ Document service for managing user documents with LightRAG
 
 import os
 import asyncio
+import codecs
+import hashlib
 import logging
-from typing import List, Optional, Dict, Any, BinaryIO
-from datetime import datetime
+import queue
+import time
+from typing import List, Optional, Dict, Any, AsyncIterator, BinaryIO, Set, Tuple
 from uuid import UUID, uuid4
+from functools import lru_cache
 import shutil
-import json
+import orjson
 from fastapi import UploadFile, HTTPException, status
 
 from app.config import DATA_DIR
 from app.services.rag_manager import get_rag_manager
-from app.utilities.lightrag_utils import ingest_document, ingest_text
+from app.services.graph_service import GraphService
+from app.services.ingestion_batcher import IngestionBatcher
+from app.utilities.lightrag_utils import ingest_documents, ingest_text
 
 logger = logging.getLogger(__name__)
 
-# Valid document MIME types that can be processed
-VALID_MIME_TYPES = [
+# Valid document MIME types that can be processed, in display order
+SUPPORTED_MIME_TYPES = (
     "text/plain",
     "text/markdown",
     "application/pdf",
@@ -27,7 +33,25 @@ VALID_MIME_TYPES = [
     "text/csv",
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document",  # .docx
     "application/msword",  # .doc
-]
+)
+
+# Set of valid MIME types for constant-time membership checks
+VALID_MIME_TYPES = frozenset(SUPPORTED_MIME_TYPES)
+
+# Metadata fields that are stored but never returned by the API
+INTERNAL_METADATA_FIELDS = frozenset({"file_path", "sha256"})
+
+# Leading bytes ("magic numbers") expected for binary document types
+MAGIC_SIGNATURES = {
+    "application/pdf": (b"%PDF-",),
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": (
+        b"PK\x03\x04",
+    ),
+    "application/msword": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),
+}
+
+# Number of leading bytes inspected when sniffing an upload's content type
+SNIFF_SIZE = 4096
 
 # Maximum file size (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
@@ -35,6 +59,72 @@ MAX_FILE_SIZE = 10 * 1024 * 1024
 # Maximum text length (1MB)
 MAX_TEXT_LENGTH = 1 * 1024 * 1024
 
+# Buffer size used when copying in-memory uploads to disk (1MB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Maximum number of idle copy buffers kept for reuse
+UPLOAD_BUFFER_POOL_SIZE = 8
+
+# Reusable upload copy buffers; a thread-safe queue since copies run in worker threads
+_upload_buffer_pool: "queue.Queue[bytearray]" = queue.Queue(maxsize=UPLOAD_BUFFER_POOL_SIZE)
+
+# Delay before pending metadata changes are written to disk (in seconds)
+METADATA_FLUSH_DELAY = 0.1
+
+# How long shutdown waits for queued ingestion batches to finish (in seconds)
+INGEST_DRAIN_TIMEOUT = 30.0
+
+# In-process document metadata, keyed by user ID
+# Note: this assumes a single worker process owns each user's metadata file
+_metadata_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+# Locks serializing metadata file reads and writes, keyed by user ID
+_metadata_locks: Dict[str, asyncio.Lock] = {}
+
+# Users whose in-memory metadata has not been written to disk yet
+_dirty_users: Set[str] = set()
+
+# Pending background flush tasks, keyed by user ID
+_flush_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _acquire_upload_buffer() -> bytearray:
+    """Take a copy buffer from the pool, allocating one if the pool is empty"""
+    try:
+        return _upload_buffer_pool.get_nowait()
+    except queue.Empty:
+        return bytearray(UPLOAD_CHUNK_SIZE)
+
+
+def _release_upload_buffer(buf: bytearray) -> None:
+    """Return a copy buffer to the pool, dropping it if the pool is full"""
+    try:
+        _upload_buffer_pool.put_nowait(buf)
+    except queue.Full:
+        pass
+
+
+@lru_cache(maxsize=4096)
+def _user_paths(user_id: str) -> Tuple[str, str]:
+    """
+    Resolve a user's documents directory and metadata file paths, creating
+    the directory on first use
+
+    Args:
+        user_id: The user ID
+
+    Returns:
+        (documents directory, metadata file path)
+    """
+    docs_dir = os.path.join(DATA_DIR, user_id, "documents")
+    os.makedirs(docs_dir, exist_ok=True)
+    return docs_dir, os.path.join(docs_dir, "metadata.json")
+
+
+def _public_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Project stored document metadata onto the fields exposed by the API"""
+    return {k: v for k, v in metadata.items() if k not in INTERNAL_METADATA_FIELDS}
+
 
 class DocumentService:
     """Service for managing document operations"""
@@ -42,19 +132,41 @@ class DocumentService:
     @staticmethod
     def get_user_docs_dir(user_id: str) -> str:
         """Get the user's documents directory"""
-        user_dir = os.path.join(DATA_DIR, user_id)
-        docs_dir = os.path.join(user_dir, "documents")
-        os.makedirs(docs_dir, exist_ok=True)
-        return docs_dir
+        return _user_paths(user_id)[0]
 
     @staticmethod
     def get_user_meta_path(user_id: str) -> str:
         """Get the path to the user's document metadata file"""
-        docs_dir = DocumentService.get_user_docs_dir(user_id)
-        return os.path.join(docs_dir, "metadata.json")
+        return _user_paths(user_id)[1]
+
+    @staticmethod
+    def _content_matches_type(head: bytes, content_type: str) -> bool:
+        """
+        Check that the leading bytes of a file match its declared content type
+
+        Args:
+            head: The first bytes of the file
+            content_type: The declared MIME type
+
+        Returns:
+            True if the content is plausible for the type
+        """
+        signatures = MAGIC_SIGNATURES.get(content_type)
+        if signatures is not None:
+            return head.startswith(signatures)
+
+        # Everything else is a text format: no NUL bytes and valid UTF-8,
+        # allowing for a multi-byte character cut off at the end of the sample
+        if b"\x00" in head:
+            return False
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        except UnicodeDecodeError:
+            return False
+        return True
 
     @staticmethod
-    def _validate_file(file: UploadFile) -> None:
+    async def _validate_file(file: UploadFile) -> None:
         """
         Validate file before processing
 
@@ -76,13 +188,31 @@ class DocumentService:
         if content_type not in VALID_MIME_TYPES:
             raise HTTPException(
                 status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                detail=f"Unsupported file type: {content_type}. Supported types: {VALID_MIME_TYPES}",
+                detail=f"Unsupported file type: {content_type}. Supported types: {list(SUPPORTED_MIME_TYPES)}",
+            )
+
+        # Check that the content matches the declared type before anything is stored
+        # UploadFile.read runs in a thread once the upload has rolled over to disk
+        head = await file.read(SNIFF_SIZE)
+        await file.seek(0)
+        if not DocumentService._content_matches_type(head, content_type):
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"File content does not match its declared type: {content_type}",
             )
 
     @staticmethod
-    async def load_metadata(user_id: str) -> Dict[str, Dict[str, Any]]:
+    def _get_metadata_lock(user_id: str) -> asyncio.Lock:
+        """Get the lock guarding a user's metadata file"""
+        lock = _metadata_locks.get(user_id)
+        if lock is None:
+            lock = _metadata_locks[user_id] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _read_metadata_file(user_id: str) -> Dict[str, Dict[str, Any]]:
         """
-        Load document metadata for a user
+        Read a user's metadata file from disk
 
         Args:
             user_id: The user ID
@@ -96,33 +226,382 @@ class DocumentService:
             return {}
 
         try:
-            with open(meta_path, "r") as f:
-                return json.load(f)
+            with open(meta_path, "rb") as f:
+                return orjson.loads(f.read())
         except Exception as e:
             logger.error(f"Error loading metadata for user {user_id}: {e}")
             return {}
 
     @staticmethod
-    async def save_metadata(user_id: str, metadata: Dict[str, Dict[str, Any]]) -> None:
+    def _write_metadata_file(user_id: str, data: bytes) -> None:
         """
-        Save document metadata for a user
+        Write a user's serialized metadata to disk
+
+        The data is written and fsynced to a temporary file which then
+        atomically replaces the metadata file, so neither readers nor a crash
+        can leave a partially written file behind. Debounced flushing means
+        this single fsync covers every update made in the flush window.
 
         Args:
             user_id: The user ID
-            metadata: Dictionary of document metadata
+            data: Serialized document metadata
         """
         meta_path = DocumentService.get_user_meta_path(user_id)
+        tmp_path = f"{meta_path}.tmp.{os.getpid()}"
+
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, meta_path)
+        except Exception:
+            # Don't leave a stale temporary file behind
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    @staticmethod
+    def _write_upload(src: BinaryIO, file_path: str) -> str:
+        """
+        Copy an uploaded file to disk and hash its content
+
+        Uploads spooled to disk are copied kernel-side with os.sendfile, and
+        in-memory uploads fall back to a buffered copy.
+
+        Args:
+            src: The uploaded file object
+            file_path: Destination path
+
+        Returns:
+            Hex SHA-256 digest of the uploaded content
+        """
+        start = src.tell()
+        digest = hashlib.sha256()
+
+        with open(file_path, "wb") as dst:
+            # Asking an in-memory SpooledTemporaryFile for its fileno would
+            # force it onto disk, so only use sendfile once it has rolled over
+            src_fd = None
+            if getattr(src, "_rolled", True):
+                try:
+                    src_fd = src.fileno()
+                except (AttributeError, OSError):
+                    src_fd = None
+
+            if src_fd is not None:
+                try:
+                    offset = start
+                    remaining = os.fstat(src_fd).st_size - start
+                    while remaining > 0:
+                        sent = os.sendfile(dst.fileno(), src_fd, offset, remaining)
+                        if sent == 0:
+                            break
+                        offset += sent
+                        remaining -= sent
+                    copied = True
+                except OSError:
+                    # sendfile between regular files isn't supported everywhere
+                    dst.seek(0)
+                    dst.truncate()
+                    copied = False
+
+                src.seek(start)
+                if copied:
+                    # sendfile never brings the data into user space, so
+                    # hash the spooled file in a separate pass
+                    DocumentService._hash_stream(src, digest)
+                    return digest.hexdigest()
+
+            readinto = getattr(src, "readinto", None)
+            if readinto is None:
+                while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                    dst.write(chunk)
+                    digest.update(chunk)
+                return digest.hexdigest()
+
+            # Copy through a pooled buffer instead of allocating bytes per chunk
+            buf = _acquire_upload_buffer()
+            try:
+                with memoryview(buf) as view:
+                    while n := readinto(buf):
+                        dst.write(view[:n])
+                        digest.update(view[:n])
+            finally:
+                _release_upload_buffer(buf)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def _hash_stream(src: BinaryIO, digest: Any) -> None:
+        """
+        Feed the rest of a file object into a hash
 
+        Args:
+            src: The file object to read from
+            digest: The hash object to update
+        """
+        buf = _acquire_upload_buffer()
+        try:
+            with memoryview(buf) as view:
+                while n := src.readinto(buf):
+                    digest.update(view[:n])
+        finally:
+            _release_upload_buffer(buf)
+
+    @staticmethod
+    def _remove_file(file_path: str) -> None:
+        """Delete a stored document file, ignoring files that are already gone"""
         try:
-            with open(meta_path, "w") as f:
-                json.dump(metadata, f, default=str)
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            logger.error(f"Error saving metadata for user {user_id}: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to save document metadata",
+            logger.error(f"Error deleting file {file_path}: {e}")
+
+    @staticmethod
+    def _read_document_text(file_path: str) -> str:
+        """Read a stored document as UTF-8 text, skipping undecodable bytes"""
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+
+    @staticmethod
+    async def _flush_metadata_later(user_id: str) -> None:
+        """
+        Flush a user's metadata once updates stop arriving
+
+        Waits METADATA_FLUSH_DELAY so bursts of updates are written once.
+
+        Args:
+            user_id: The user ID
+        """
+        try:
+            while user_id in _dirty_users:
+                await asyncio.sleep(METADATA_FLUSH_DELAY)
+                await DocumentService.flush_metadata(user_id)
+        finally:
+            # Unless drop_cached_metadata already replaced this task
+            if _flush_tasks.get(user_id) is asyncio.current_task():
+                del _flush_tasks[user_id]
+
+    @staticmethod
+    async def stop_ingestion(timeout: float = INGEST_DRAIN_TIMEOUT) -> None:
+        """
+        Let queued ingestion batches finish, then stop the ingestion workers
+
+        Batches still queued after the timeout are dropped and their documents
+        stay in the processing state.
+
+        Args:
+            timeout: Maximum time to wait for queued batches (in seconds)
+        """
+        try:
+            await asyncio.wait_for(_ingestion_batcher.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Ingestion still running at shutdown, dropping queued batches"
+            )
+        await _ingestion_batcher.stop()
+
+    @staticmethod
+    async def flush_metadata(user_id: Optional[str] = None) -> None:
+        """
+        Write pending metadata changes to disk
+
+        Args:
+            user_id: The user ID, or None to flush every user with pending changes
+        """
+        user_ids = [user_id] if user_id is not None else list(_dirty_users)
+
+        for uid in user_ids:
+            async with DocumentService._get_metadata_lock(uid):
+                # Another flush may have written (or dropped) the changes meanwhile
+                if uid not in _dirty_users:
+                    continue
+
+                # Cleared before writing, so updates made during the write
+                # mark the user dirty again
+                _dirty_users.discard(uid)
+                try:
+                    # Serialize on the loop so the dict can't change mid-dump,
+                    # then leave the blocking file I/O to a worker thread
+                    data = orjson.dumps(_metadata_cache[uid])
+                    await asyncio.to_thread(DocumentService._write_metadata_file, uid, data)
+                except Exception as e:
+                    logger.error(f"Error saving metadata for user {uid}: {e}")
+                    # Keep the changes pending so the next flush retries them
+                    if uid in _metadata_cache:
+                        _dirty_users.add(uid)
+
+    @staticmethod
+    async def drop_cached_metadata(user_id: str) -> None:
+        """
+        Forget a user's cached metadata, e.g. after the file was replaced on disk
+
+        Pending unflushed changes for the user are discarded. Holding the
+        metadata lock waits out a write already in progress, and the pending
+        flush is cancelled so it can't overwrite the file afterwards.
+
+        Args:
+            user_id: The user ID
+        """
+        async with DocumentService._get_metadata_lock(user_id):
+            task = _flush_tasks.pop(user_id, None)
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+            _metadata_cache.pop(user_id, None)
+            _dirty_users.discard(user_id)
+
+    @staticmethod
+    async def load_metadata(user_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Load document metadata for a user
+
+        The metadata file is read once per process and served from memory afterwards.
+
+        Args:
+            user_id: The user ID
+
+        Returns:
+            Dictionary of document metadata
+        """
+        metadata = _metadata_cache.get(user_id)
+        if metadata is not None:
+            return metadata
+
+        async with DocumentService._get_metadata_lock(user_id):
+            if user_id not in _metadata_cache:
+                _metadata_cache[user_id] = await asyncio.to_thread(
+                    DocumentService._read_metadata_file, user_id
+                )
+            return _metadata_cache[user_id]
+
+    @staticmethod
+    async def save_metadata(user_id: str, metadata: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Save document metadata for a user
+
+        The in-memory copy is updated immediately; the file on disk is written
+        by a background flush shortly afterwards.
+
+        Args:
+            user_id: The user ID
+            metadata: Dictionary of document metadata
+        """
+        _metadata_cache[user_id] = metadata
+        DocumentService._mark_dirty(user_id)
+
+    @staticmethod
+    def _mark_dirty(user_id: str) -> None:
+        """Record that a user's metadata changed and schedule a flush"""
+        _dirty_users.add(user_id)
+
+        if user_id not in _flush_tasks:
+            _flush_tasks[user_id] = asyncio.create_task(
+                DocumentService._flush_metadata_later(user_id)
             )
 
+    @staticmethod
+    async def get_doc_metadata(user_id: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored metadata of a single document
+
+        Args:
+            user_id: The user ID
+            doc_id: The document ID
+
+        Returns:
+            The document metadata, or None if the document doesn't exist
+        """
+        all_metadata = await DocumentService.load_metadata(user_id)
+        return all_metadata.get(doc_id)
+
+    @staticmethod
+    async def put_doc_metadata(user_id: str, metadata: Dict[str, Any]) -> None:
+        """
+        Insert or replace the metadata of a single document
+
+        Args:
+            user_id: The user ID
+            metadata: The document metadata (must contain "id")
+        """
+        all_metadata = await DocumentService.load_metadata(user_id)
+        all_metadata[metadata["id"]] = metadata
+        DocumentService._mark_dirty(user_id)
+
+    @staticmethod
+    async def delete_doc_metadata(user_id: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove the metadata of a single document
+
+        Args:
+            user_id: The user ID
+            doc_id: The document ID
+
+        Returns:
+            The removed metadata, or None if the document doesn't exist
+        """
+        all_metadata = await DocumentService.load_metadata(user_id)
+        metadata = all_metadata.pop(doc_id, None)
+        if metadata is not None:
+            DocumentService._mark_dirty(user_id)
+        return metadata
+
+    @staticmethod
+    async def list_doc_metadata(user_id: str) -> List[Dict[str, Any]]:
+        """
+        List the stored metadata of all of a user's documents
+
+        Args:
+            user_id: The user ID
+
+        Returns:
+            List of document metadata
+        """
+        all_metadata = await DocumentService.load_metadata(user_id)
+        return list(all_metadata.values())
+
+    @staticmethod
+    async def _find_ingested_duplicate(
+        user_id: str, sha256: str, exclude_id: str
+    ) -> Optional[str]:
+        """
+        Find a document of the user's with the same content that is already
+        ingested
+
+        Documents still being processed don't count: their ingestion may yet
+        fail, which would leave the duplicate marked complete but never ingested.
+
+        Args:
+            user_id: The user ID
+            sha256: Hex SHA-256 digest of the content
+            exclude_id: Document ID to ignore (the new upload itself)
+
+        Returns:
+            The ID of the matching document, or None
+        """
+        all_metadata = await DocumentService.load_metadata(user_id)
+        for doc_id, metadata in all_metadata.items():
+            if (
+                doc_id != exclude_id
+                and metadata.get("sha256") == sha256
+                and metadata.get("status") == "complete"
+            ):
+                return doc_id
+        return None
+
+    @staticmethod
+    async def _set_doc_status(user_id: str, doc_id: str, doc_status: str) -> None:
+        """Update the processing status of a document if it still exists"""
+        metadata = await DocumentService.get_doc_metadata(user_id, doc_id)
+        if metadata is not None:
+            metadata["status"] = doc_status
+            DocumentService._mark_dirty(user_id)
+
     @staticmethod
     async def upload_document(
         user_id: str,
@@ -145,7 +624,7 @@ class DocumentService:
             Document metadata
         """
         # Validate the file
-        DocumentService._validate_file(file)
+        await DocumentService._validate_file(file)
 
         # Generate a unique ID for the document
         doc_id = str(uuid4())
@@ -156,8 +635,8 @@ class DocumentService:
         # Define file paths
         file_path = os.path.join(docs_dir, f"{doc_id}_{file.filename}")
 
-        # Save file metadata
-        now = datetime.now(datetime.timezone.utc)
+        # Timestamps are stored as epoch seconds; the response models parse them
+        now = time.time()
         metadata = {
             "id": doc_id,
             "user_id": user_id,
@@ -169,91 +648,110 @@ class DocumentService:
             "created_at": now,
             "updated_at": now,
             "tags": tags or [],
-            "status": "uploading",
+            "status": "processing",
             "file_path": file_path,
         }
 
-        # Load existing metadata
-        all_metadata = await DocumentService.load_metadata(user_id)
-        all_metadata[doc_id] = metadata
-
-        # Save updated metadata
-        await DocumentService.save_metadata(user_id, all_metadata)
-
         try:
-            # Save the file to disk
-            with open(file_path, "wb") as f:
-                # Read file in chunks to avoid memory issues
-                content = await file.read()
-                f.write(content)
-
-            # Update status
-            metadata["status"] = "processing"
-            all_metadata[doc_id] = metadata
-            await DocumentService.save_metadata(user_id, all_metadata)
-
-            # Process with LightRAG in the background
-            asyncio.create_task(
-                DocumentService._process_document(
-                    user_id, doc_id, file_path, content.decode("utf-8", errors="ignore")
-                )
+            # Stream the file to disk in chunks so memory use stays bounded,
+            # without blocking the event loop
+            sha256 = await asyncio.to_thread(
+                DocumentService._write_upload, file.file, file_path
             )
-
-            # Return metadata without internal fields
-            response_metadata = metadata.copy()
-            response_metadata.pop("file_path", None)
-            return response_metadata
-
         except Exception as e:
             logger.error(f"Error uploading document for user {user_id}: {e}")
 
-            # Update status to failed
-            if doc_id in all_metadata:
-                all_metadata[doc_id]["status"] = "failed"
-                await DocumentService.save_metadata(user_id, all_metadata)
+            # Record the failed upload
+            metadata["status"] = "failed"
+            await DocumentService.put_doc_metadata(user_id, metadata)
 
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to upload document: {str(e)}",
             )
 
+        metadata["sha256"] = sha256
+
+        # Identical content is already in the user's knowledge base, so
+        # skip the embedding pipeline for it
+        duplicate_id = await DocumentService._find_ingested_duplicate(
+            user_id, sha256, doc_id
+        )
+        if duplicate_id is not None:
+            logger.info(
+                f"Document {doc_id} duplicates {duplicate_id} for user {user_id}, skipping ingestion"
+            )
+            metadata["status"] = "complete"
+
+        # Save the document metadata now that the file is on disk, so it is
+        # written once with its final upload status
+        await DocumentService.put_doc_metadata(user_id, metadata)
+
+        if duplicate_id is None:
+            # Queue for LightRAG processing; documents arriving together are batched
+            _ingestion_batcher.submit(user_id, (doc_id, file_path))
+
+        # Return metadata without internal fields
+        return _public_metadata(metadata)
+
     @staticmethod
-    async def _process_document(
-        user_id: str, doc_id: str, file_path: str, content: str
-    ) -> None:
+    async def _process_documents(user_id: str, jobs: List[Tuple[str, str]]) -> None:
         """
-        Process a document with LightRAG
+        Process a batch of uploaded documents with LightRAG
 
         Args:
             user_id: The user ID
-            doc_id: The document ID
-            file_path: Path to the document file
-            content: Document content
+            jobs: (document ID, file path) pairs
         """
+        doc_ids = []
+        file_paths = []
+        contents = []
+
+        # Read the document texts back from disk now that they are needed
+        for doc_id, file_path in jobs:
+            try:
+                content = await asyncio.to_thread(
+                    DocumentService._read_document_text, file_path
+                )
+            except Exception as e:
+                logger.error(f"Error reading document {doc_id} for user {user_id}: {e}")
+                await DocumentService._set_doc_status(user_id, doc_id, "failed")
+                continue
+
+            doc_ids.append(doc_id)
+            file_paths.append(file_path)
+            contents.append(content)
+
+        if not doc_ids:
+            return
+
         try:
             # Get the RAG instance for the user
             rag_manager = get_rag_manager()
-            rag = rag_manager.get_instance(user_id)
+            with rag_manager.in_use(user_id):
+                rag = await rag_manager.aget_instance(user_id)
+
+                # Ingest the whole batch into LightRAG in one call
+                await ingest_documents(rag, contents, doc_ids, file_paths)
+                GraphService.invalidate_cache(rag)
 
-            # Ingest the document into LightRAG
-            await ingest_document(rag, content, doc_id, file_path)
+                # Ingestion grows the working directory weighed by eviction
+                await rag_manager.refresh_size(user_id)
 
             # Update status to completed
-            all_metadata = await DocumentService.load_metadata(user_id)
-            if doc_id in all_metadata:
-                all_metadata[doc_id]["status"] = "complete"
-                await DocumentService.save_metadata(user_id, all_metadata)
+            for doc_id in doc_ids:
+                await DocumentService._set_doc_status(user_id, doc_id, "complete")
 
-            logger.info(f"Document {doc_id} processed successfully for user {user_id}")
+            logger.info(
+                f"Documents {doc_ids} processed successfully for user {user_id}"
+            )
 
         except Exception as e:
-            logger.error(f"Error processing document {doc_id} for user {user_id}: {e}")
+            logger.error(f"Error processing documents {doc_ids} for user {user_id}: {e}")
 
             # Update status to failed
-            all_metadata = await DocumentService.load_metadata(user_id)
-            if doc_id in all_metadata:
-                all_metadata[doc_id]["status"] = "failed"
-                await DocumentService.save_metadata(user_id, all_metadata)
+            for doc_id in doc_ids:
+                await DocumentService._set_doc_status(user_id, doc_id, "failed")
 
     @staticmethod
     async def get_documents(user_id: str) -> List[Dict[str, Any]]:
@@ -266,17 +764,29 @@ class DocumentService:
         Returns:
             List of document metadata
         """
-        all_metadata = await DocumentService.load_metadata(user_id)
-
         # Return all documents without internal fields
-        documents = []
-        for doc_id, metadata in all_metadata.items():
-            doc_metadata = metadata.copy()
-            doc_metadata.pop("file_path", None)
-            documents.append(doc_metadata)
+        documents = [
+            _public_metadata(metadata)
+            for metadata in await DocumentService.list_doc_metadata(user_id)
+        ]
 
         return documents
 
+    @staticmethod
+    async def iter_documents(user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over a user's documents, building each one only as it is consumed
+
+        Args:
+            user_id: The user ID
+
+        Yields:
+            Document metadata without internal fields
+        """
+        # Snapshot the entries so uploads finishing mid-iteration are safe
+        for metadata in await DocumentService.list_doc_metadata(user_id):
+            yield _public_metadata(metadata)
+
     @staticmethod
     async def get_document(user_id: str, doc_id: str) -> Dict[str, Any]:
         """
@@ -292,18 +802,16 @@ class DocumentService:
         Raises:
             HTTPException: If the document doesn't exist
         """
-        all_metadata = await DocumentService.load_metadata(user_id)
+        metadata = await DocumentService.get_doc_metadata(user_id, doc_id)
 
-        if doc_id not in all_metadata:
+        if metadata is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Document {doc_id} not found",
             )
 
         # Return document without internal fields
-        metadata = all_metadata[doc_id].copy()
-        metadata.pop("file_path", None)
-        return metadata
+        return _public_metadata(metadata)
 
     @staticmethod
     async def update_document(
@@ -329,16 +837,15 @@ class DocumentService:
         Raises:
             HTTPException: If the document doesn't exist
         """
-        all_metadata = await DocumentService.load_metadata(user_id)
+        metadata = await DocumentService.get_doc_metadata(user_id, doc_id)
 
-        if doc_id not in all_metadata:
+        if metadata is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Document {doc_id} not found",
             )
 
         # Update fields
-        metadata = all_metadata[doc_id]
         if title is not None:
             metadata["title"] = title
         if description is not None:
@@ -347,15 +854,13 @@ class DocumentService:
             metadata["tags"] = tags
 
         # Update timestamp
-        metadata["updated_at"] = datetime.now(datetime.timezone.utc)
+        metadata["updated_at"] = time.time()
 
         # Save updated metadata
-        await DocumentService.save_metadata(user_id, all_metadata)
+        await DocumentService.put_doc_metadata(user_id, metadata)
 
         # Return updated metadata without internal fields
-        response_metadata = metadata.copy()
-        response_metadata.pop("file_path", None)
-        return response_metadata
+        return _public_metadata(metadata)
 
     @staticmethod
     async def ingest_text_content(
@@ -398,7 +903,7 @@ class DocumentService:
         doc_id = str(uuid4())
 
         # Save metadata
-        now = datetime.now(datetime.timezone.utc)
+        now = time.time()
         metadata = {
             "id": doc_id,
             "user_id": user_id,
@@ -412,12 +917,8 @@ class DocumentService:
             "status": "processing",
         }
 
-        # Load existing metadata
-        all_metadata = await DocumentService.load_metadata(user_id)
-        all_metadata[doc_id] = metadata
-
-        # Save updated metadata
-        await DocumentService.save_metadata(user_id, all_metadata)
+        # Save the text metadata
+        await DocumentService.put_doc_metadata(user_id, metadata)
 
         try:
             # Process with LightRAG in the background
@@ -432,9 +933,7 @@ class DocumentService:
             logger.error(f"Error ingesting text for user {user_id}: {e}")
 
             # Update status to failed
-            if doc_id in all_metadata:
-                all_metadata[doc_id]["status"] = "failed"
-                await DocumentService.save_metadata(user_id, all_metadata)
+            await DocumentService._set_doc_status(user_id, doc_id, "failed")
 
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -457,19 +956,21 @@ class DocumentService:
         try:
             # Get the RAG instance for the user
             rag_manager = get_rag_manager()
-            rag = rag_manager.get_instance(user_id)
-
             # Prepare metadata
             metadata = {"source": "direct_text_input", "title": title}
 
-            # Ingest the text into LightRAG
-            await ingest_text(rag, content, doc_id, title, metadata)
+            with rag_manager.in_use(user_id):
+                rag = await rag_manager.aget_instance(user_id)
+
+                # Ingest the text into LightRAG
+                await ingest_text(rag, content, doc_id, title, metadata)
+                GraphService.invalidate_cache(rag)
+
+                # Ingestion grows the working directory weighed by eviction
+                await rag_manager.refresh_size(user_id)
 
             # Update status to completed
-            all_metadata = await DocumentService.load_metadata(user_id)
-            if doc_id in all_metadata:
-                all_metadata[doc_id]["status"] = "complete"
-                await DocumentService.save_metadata(user_id, all_metadata)
+            await DocumentService._set_doc_status(user_id, doc_id, "complete")
 
             logger.info(f"Text {doc_id} processed successfully for user {user_id}")
 
@@ -477,10 +978,7 @@ class DocumentService:
             logger.error(f"Error processing text {doc_id} for user {user_id}: {e}")
 
             # Update status to failed
-            all_metadata = await DocumentService.load_metadata(user_id)
-            if doc_id in all_metadata:
-                all_metadata[doc_id]["status"] = "failed"
-                await DocumentService.save_metadata(user_id, all_metadata)
+            await DocumentService._set_doc_status(user_id, doc_id, "failed")
 
     @staticmethod
     async def delete_document(user_id: str, doc_id: str) -> Dict[str, Any]:
@@ -497,27 +995,22 @@ class DocumentService:
         Raises:
             HTTPException: If the document doesn't exist
         """
-        all_metadata = await DocumentService.load_metadata(user_id)
+        # Remove from metadata
+        metadata = await DocumentService.delete_doc_metadata(user_id, doc_id)
 
-        if doc_id not in all_metadata:
+        if metadata is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Document {doc_id} not found",
             )
 
-        # Get file path before removing metadata
-        file_path = all_metadata[doc_id].get("file_path")
+        # Get file path from the removed metadata
+        file_path = metadata.get("file_path")
 
-        # Remove from metadata
-        metadata = all_metadata.pop(doc_id)
-        await DocumentService.save_metadata(user_id, all_metadata)
-
-        # Delete file if it exists
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.error(f"Error deleting file {file_path}: {e}")
+        # Delete the file off the event loop; the metadata change is already
+        # queued for a background flush, so the two overlap
+        if file_path:
+            await asyncio.to_thread(DocumentService._remove_file, file_path)
 
         # TODO: Remove from LightRAG index (when LightRAG supports document deletion)
 
@@ -526,3 +1019,7 @@ class DocumentService:
             "success": True,
             "message": "Document deleted successfully",
         }
+
+
+# Batches uploaded documents per user before they are ingested into LightRAG
+_ingestion_batcher = IngestionBatcher(DocumentService._process_documents)
@@ -0,0 +1,214 @@
+"""
+Coalescing of concurrent embedding requests
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import MAX_TOKEN_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of texts sent to the embedding API in one request
+EMBED_BATCH_SIZE = 256
+
+# Approximate token budget of one request
+EMBED_BATCH_TOKENS = MAX_TOKEN_SIZE * 8
+
+# How long to wait for more texts before sending a partial batch (in seconds)
+EMBED_BATCH_TIMEOUT = 0.005
+
+# Maximum number of embedding calls waiting to be batched
+EMBED_QUEUE_SIZE = 1024
+
+# Number of embedding requests in flight at once
+EMBED_CONCURRENCY = 8
+
+EmbedRequest = Tuple[List[str], asyncio.Future]
+
+
+def _estimate_tokens(texts: List[str]) -> int:
+    """Roughly estimate the token count of texts (about four characters per token)"""
+    return sum(len(text) for text in texts) // 4 + len(texts)
+
+
+class EmbeddingBatcher:
+    """
+    Merges embedding calls that arrive close together into a single request,
+    so K concurrent callers cost about K / batch_size API round-trips instead of K.
+
+    Callers get back exactly the rows for their own texts, in order.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[Any]],
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_tokens: int = EMBED_BATCH_TOKENS,
+        wait_timeout: float = EMBED_BATCH_TIMEOUT,
+        max_pending: int = EMBED_QUEUE_SIZE,
+        max_concurrency: int = EMBED_CONCURRENCY,
+    ):
+        """
+        Initialize the batcher
+
+        Args:
+            embed: Coroutine function that embeds a list of texts
+            batch_size: Maximum number of texts per request
+            max_tokens: Approximate maximum number of tokens per request
+            wait_timeout: Time to wait for more texts before sending a partial batch
+            max_pending: Maximum number of calls waiting to be batched
+            max_concurrency: Maximum number of requests in flight
+        """
+        self.embed_func = embed
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.wait_timeout = wait_timeout
+        self.max_pending = max_pending
+        self.max_concurrency = max_concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._carry: Optional[EmbedRequest] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def embed(self, texts: List[str], **kwargs: Any) -> np.ndarray:
+        """
+        Embed texts as part of the next batch
+
+        Args:
+            texts: Texts to embed
+            **kwargs: Extra arguments for the embedding function; calls with
+                arguments are sent on their own
+
+        Returns:
+            One embedding row per text
+        """
+        if kwargs or not texts:
+            return await self.embed_func(texts, **kwargs)
+
+        if isinstance(texts, str):
+            texts = [texts]
+
+        self._start_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((list(texts), future))
+        return await future
+
+    async def stop(self) -> None:
+        """Cancel the worker and in-flight requests, failing every waiting call"""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+
+        # Requests already sent; each cancels its own callers
+        in_flight = list(self._in_flight)
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+        waiting = [self._carry] if self._carry is not None else []
+        while self._queue is not None and not self._queue.empty():
+            waiting.append(self._queue.get_nowait())
+        for _, future in waiting:
+            if not future.done():
+                future.cancel()
+
+        self._worker = None
+        self._queue = None
+        self._carry = None
+
+    def _start_worker(self) -> None:
+        """Start the worker on first use, inside the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and self._worker.get_loop() is loop:
+            return
+
+        # A worker left over from a closed event loop can never run again
+        self._carry = None
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """Collect calls into batches and send each batch as it fills up"""
+        limit = asyncio.Semaphore(self.max_concurrency)
+        while True:
+            batch = await self._collect()
+            await limit.acquire()
+            task = asyncio.create_task(self._send(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+            task.add_done_callback(lambda _: limit.release())
+
+    async def _collect(self) -> List[EmbedRequest]:
+        """
+        Wait for the next batch of calls
+
+        Returns:
+            Calls whose texts fit in one request (a single oversized call is
+            sent on its own)
+        """
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self._queue.get()
+
+        batch = [first]
+        count = len(first[0])
+        tokens = _estimate_tokens(first[0])
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+
+        while count < self.batch_size and tokens < self.max_tokens:
+            remaining = deadline - asyncio.get_running_loop().time()
+            try:
+                if remaining <= 0:
+                    request = self._queue.get_nowait()
+                else:
+                    request = await asyncio.wait_for(self._queue.get(), remaining)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+
+            request_tokens = _estimate_tokens(request[0])
+            if (
+                count + len(request[0]) > self.batch_size
+                or tokens + request_tokens > self.max_tokens
+            ):
+                # Doesn't fit; it starts the next batch
+                self._carry = request
+                break
+
+            batch.append(request)
+            count += len(request[0])
+            tokens += request_tokens
+
+        return batch
+
+    async def _send(self, batch: List[EmbedRequest]) -> None:
+        """
+        Embed a batch in one request and hand each caller its rows
+
+        Args:
+            batch: Calls to embed together
+        """
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            embeddings = np.asarray(await self.embed_func(texts))
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Error embedding batch of {len(texts)} texts: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for request_texts, future in batch:
+            end = start + len(request_texts)
+            if not future.done():
+                future.set_result(embeddings[start:end])
+            start = end
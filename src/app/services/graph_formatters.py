@@ -0,0 +1,194 @@
+"""
+Formatters that convert knowledge graph data for visualization libraries
+
+This module is kept free of dynamic features and fully annotated so it can be
+compiled with mypyc (``mypyc app/services/graph_formatters.py``), which the
+Docker image does at build time. The pure-Python version is used when no
+compiled build is present, e.g. in development.
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+GraphElement = Dict[str, Any]
+GraphFormatter = Callable[[List[GraphElement], List[GraphElement]], Dict[str, Any]]
+
+# Keys every node and edge is expected to have (see GraphNode and GraphEdge)
+NODE_KEYS = ("id", "label")
+EDGE_KEYS = ("source", "target", "type")
+
+# JSON-LD context shared by every JSON-LD response
+JSONLD_CONTEXT: Dict[str, str] = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "label": "rdfs:label",
+    "type": "rdf:type",
+    "property": "rdf:Property",
+}
+
+
+def _with_keys(element: GraphElement, keys: Tuple[str, ...]) -> GraphElement:
+    """Return the element with any missing required keys set to None"""
+    missing = [key for key in keys if key not in element]
+    if not missing:
+        return element
+    return {**element, **dict.fromkeys(missing)}
+
+
+def to_d3(nodes: List[GraphElement], edges: List[GraphElement]) -> Dict[str, Any]:
+    """
+    Format graph data for D3.js
+
+    Args:
+        nodes: Graph nodes
+        edges: Graph edges
+
+    Returns:
+        Dictionary with nodes and links
+    """
+    # Lists are sized up front so large graphs don't pay for repeated growth
+    d3_nodes: List[Any] = [None] * len(nodes)
+    for i, node in enumerate(nodes):
+        label = node["label"]
+        item: GraphElement = {"id": node["id"], "label": label, "group": label}
+        # Most elements have no properties; skip the merge for those
+        properties = node.get("properties")
+        if properties:
+            item.update(properties)
+        d3_nodes[i] = item
+
+    d3_links: List[Any] = [None] * len(edges)
+    for i, edge in enumerate(edges):
+        item = {
+            "source": edge["source"],
+            "target": edge["target"],
+            "type": edge["type"],
+            "value": 1,
+        }
+        properties = edge.get("properties")
+        if properties:
+            item.update(properties)
+        d3_links[i] = item
+
+    return {"nodes": d3_nodes, "links": d3_links}
+
+
+def to_cytoscape(
+    nodes: List[GraphElement], edges: List[GraphElement]
+) -> Dict[str, Any]:
+    """
+    Format graph data for Cytoscape.js
+
+    Args:
+        nodes: Graph nodes
+        edges: Graph edges
+
+    Returns:
+        Dictionary with cytoscape elements
+    """
+    cy_nodes: List[Any] = [None] * len(nodes)
+    for i, node in enumerate(nodes):
+        data: GraphElement = {"id": node["id"], "label": node["label"]}
+        properties = node.get("properties")
+        if properties:
+            data.update(properties)
+        cy_nodes[i] = {"data": data}
+
+    cy_edges: List[Any] = [None] * len(edges)
+    for i, edge in enumerate(edges):
+        # Each key is read once and reused for the edge ID
+        source = edge["source"]
+        target = edge["target"]
+        edge_type = edge["type"]
+        data = {
+            "id": f"{source}-{edge_type}-{target}",
+            "source": source,
+            "target": target,
+            "label": edge_type,
+        }
+        properties = edge.get("properties")
+        if properties:
+            data.update(properties)
+        cy_edges[i] = {"data": data}
+
+    return {"elements": {"nodes": cy_nodes, "edges": cy_edges}}
+
+
+def to_jsonld(nodes: List[GraphElement], edges: List[GraphElement]) -> Dict[str, Any]:
+    """
+    Format graph data as JSON-LD
+
+    Args:
+        nodes: Graph nodes
+        edges: Graph edges
+
+    Returns:
+        JSON-LD document with context and graph
+    """
+    node_count = len(nodes)
+    graph: List[Any] = [None] * (node_count + len(edges))
+
+    # Add nodes
+    for i, node in enumerate(nodes):
+        label = node["label"]
+        node_obj: GraphElement = {"@id": node["id"], "type": label, "label": label}
+        properties = node.get("properties")
+        if properties:
+            node_obj.update(properties)
+        graph[i] = node_obj
+
+    # Add edges after the nodes
+    for i, edge in enumerate(edges, node_count):
+        source = edge["source"]
+        target = edge["target"]
+        edge_type = edge["type"]
+        edge_obj: GraphElement = {
+            "@id": f"{source}-{edge_type}-{target}",
+            "type": "property",
+            "label": edge_type,
+            "source": {"@id": source},
+            "target": {"@id": target},
+        }
+        properties = edge.get("properties")
+        if properties:
+            edge_obj.update(properties)
+        graph[i] = edge_obj
+
+    return {"@context": JSONLD_CONTEXT, "@graph": graph}
+
+
+# Formatter for each supported visualization format
+FORMATTERS: Dict[str, GraphFormatter] = {
+    "d3": to_d3,
+    "cytoscape": to_cytoscape,
+    "jsonld": to_jsonld,
+}
+
+
+def format_graph(graph_data: Dict[str, Any], format: str) -> Dict[str, Any]:
+    """
+    Format graph data for a visualization library
+
+    Args:
+        graph_data: Graph data with nodes and edges
+        format: Desired format (d3, cytoscape, jsonld)
+
+    Returns:
+        Formatted graph data, or the original data for unknown formats
+    """
+    formatter = FORMATTERS.get(format)
+    if formatter is None:
+        # Default format - just return the original data
+        return graph_data
+
+    nodes: List[GraphElement] = graph_data.get("nodes", [])
+    edges: List[GraphElement] = graph_data.get("edges", [])
+    try:
+        # Formatters index the required keys directly
+        return formatter(nodes, edges)
+    except KeyError:
+        # Rare malformed elements take the slow path: fill in the missing keys
+        return formatter(
+            [_with_keys(node, NODE_KEYS) for node in nodes],
+            [_with_keys(edge, EDGE_KEYS) for edge in edges],
+        )
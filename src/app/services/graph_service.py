@@ -2,18 +2,131 @@
 Service for knowledge graph operations using LightRAG
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any, Union
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Hashable, Tuple, Union
 from fastapi import HTTPException, status
 
+from app.services.graph_formatters import format_graph
+from app.utilities.semantic_cache import invalidate_query_cache
+
 logger = logging.getLogger(__name__)
 
+# Maximum number of cached graph read results per LightRAG instance
+GRAPH_CACHE_SIZE = 4096
+
+# How long a cached graph read result stays valid (in seconds)
+GRAPH_CACHE_TTL = 60
+
+
+class _GraphQueryCache:
+    """
+    LRU cache of graph read results for a single LightRAG instance, with
+    entries expiring after a TTL
+    """
+
+    def __init__(self, maxsize: int = GRAPH_CACHE_SIZE, ttl: float = GRAPH_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a cached result, or None if it is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache a result, evicting the least recently used entries if full"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached result"""
+        self._entries.clear()
+
+
+def _graph_cache(rag) -> _GraphQueryCache:
+    """
+    Get the read cache attached to a LightRAG instance, creating it on first use
+
+    Keeping the cache on the instance ties it to one user's graph and drops it
+    when the RAG manager evicts the instance.
+    """
+    cache = vars(rag).get("_graph_query_cache")
+    if cache is None:
+        cache = _GraphQueryCache()
+        rag._graph_query_cache = cache
+    return cache
+
+
+def _subgraph_response(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the subgraph response body, looking up each list only once"""
+    nodes = graph.get("nodes") or []
+    edges = graph.get("edges") or []
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "total_nodes": len(nodes),
+        "total_edges": len(edges),
+    }
+
+
+def _filter_key(values: Optional[List[str]]) -> Tuple[str, ...]:
+    """Normalize an optional filter list into a hashable cache key part"""
+    return tuple(sorted(values or ()))
+
+
+def _is_not_found(error: Exception) -> bool:
+    """
+    Check whether an error raised by LightRAG means a node doesn't exist
+
+    Only a KeyError counts. LightRAG has no dedicated not-found exception, and
+    other errors mentioning "not found" (a missing table or file, say) are
+    storage failures that should stay 500s.
+    """
+    return isinstance(error, KeyError)
+
+
+def _node_not_found(node_id: str) -> HTTPException:
+    """Build the 404 error for a missing node"""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Node with ID {node_id} not found",
+    )
+
 
 class GraphService:
     """
     Service class for knowledge graph operations
     """
 
+    @staticmethod
+    def invalidate_cache(rag) -> None:
+        """
+        Drop cached graph reads and query results for a LightRAG instance
+        after its graph changes
+
+        Args:
+            rag: The LightRAG instance
+        """
+        cache = vars(rag).get("_graph_query_cache")
+        if cache is not None:
+            cache.clear()
+        invalidate_query_cache(rag)
+
     @staticmethod
     async def get_graph(
         rag,
@@ -36,8 +149,22 @@ class GraphService:
             Dictionary with nodes and edges
         """
         try:
+            cache = _graph_cache(rag)
+            cache_key = (
+                "graph",
+                limit,
+                offset,
+                _filter_key(node_labels),
+                _filter_key(edge_types),
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
             logger.info(
-                f"Getting graph with filters: labels={node_labels}, edge_types={edge_types}"
+                "Getting graph with filters: labels=%s, edge_types=%s",
+                node_labels,
+                edge_types,
             )
 
             # Call LightRAG to get the graph
@@ -49,14 +176,11 @@ class GraphService:
             )
 
             # Format the response
-            return {
-                "nodes": graph.get("nodes", []),
-                "edges": graph.get("edges", []),
-                "total_nodes": len(graph.get("nodes", [])),
-                "total_edges": len(graph.get("edges", [])),
-            }
+            result = _subgraph_response(graph)
+            cache.put(cache_key, result)
+            return result
         except Exception as e:
-            logger.error(f"Error getting graph: {str(e)}")
+            logger.error("Error getting graph: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error getting graph: {str(e)}",
@@ -75,27 +199,55 @@ class GraphService:
             Node data
         """
         try:
-            logger.info(f"Getting node with ID: {node_id}")
+            cache = _graph_cache(rag)
+            cache_key = ("node", node_id)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            logger.info("Getting node with ID: %s", node_id)
 
             # Call LightRAG to get the node
             node = await rag.get_node(node_id=node_id)
 
             if not node:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Node with ID {node_id} not found",
-                )
+                raise _node_not_found(node_id)
 
+            cache.put(cache_key, node)
             return node
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error getting node {node_id}: {str(e)}")
+            logger.error("Error getting node %s: %s", node_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error getting node: {str(e)}",
             )
 
+    @staticmethod
+    async def _find_missing_node(rag, *node_ids: str) -> Optional[str]:
+        """
+        Work out which of several nodes doesn't exist, looking them up concurrently
+
+        Args:
+            rag: The LightRAG instance
+            node_ids: IDs of the nodes to check
+
+        Returns:
+            ID of the first missing node, or None if all of them exist
+        """
+        nodes = await asyncio.gather(
+            *(rag.get_node(node_id=node_id) for node_id in node_ids),
+            return_exceptions=True,
+        )
+        for node_id, node in zip(node_ids, nodes):
+            if isinstance(node, Exception):
+                if _is_not_found(node):
+                    return node_id
+            elif not node:
+                return node_id
+        return None
+
     @staticmethod
     async def create_node(
         rag, label: str, properties: Dict[str, Any]
@@ -112,18 +264,21 @@ class GraphService:
             Created node data with ID
         """
         try:
-            logger.info(f"Creating node with label: {label}")
+            logger.info("Creating node with label: %s", label)
 
             # Call LightRAG to create the node
             node = await rag.create_node(label=label, properties=properties)
 
             return node
         except Exception as e:
-            logger.error(f"Error creating node: {str(e)}")
+            logger.error("Error creating node: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error creating node: {str(e)}",
             )
+        finally:
+            # The graph may have changed even if the call failed part way
+            GraphService.invalidate_cache(rag)
 
     @staticmethod
     async def update_node(
@@ -145,10 +300,7 @@ class GraphService:
             Updated node data
         """
         try:
-            logger.info(f"Updating node with ID: {node_id}")
-
-            # Get the current node
-            current_node = await GraphService.get_node(rag, node_id)
+            logger.info("Updating node with ID: %s", node_id)
 
             # Prepare the update data
             update_data = {}
@@ -158,18 +310,27 @@ class GraphService:
             if properties is not None:
                 update_data["properties"] = properties
 
-            # Call LightRAG to update the node
-            updated_node = await rag.update_node(node_id=node_id, **update_data)
+            # Call LightRAG to update the node. A missing node raises a
+            # KeyError or, with some storages, returns nothing, so there's no
+            # need to look it up first
+            node = await rag.update_node(node_id=node_id, **update_data)
+
+            if not node:
+                raise _node_not_found(node_id)
 
-            return updated_node
+            return node
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error updating node {node_id}: {str(e)}")
+            if _is_not_found(e):
+                raise _node_not_found(node_id)
+            logger.error("Error updating node %s: %s", node_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error updating node: {str(e)}",
             )
+        finally:
+            GraphService.invalidate_cache(rag)
 
     @staticmethod
     async def delete_node(rag, node_id: str) -> Dict[str, Any]:
@@ -184,14 +345,15 @@ class GraphService:
             Deletion result
         """
         try:
-            logger.info(f"Deleting node with ID: {node_id}")
-
-            # Verify the node exists
-            await GraphService.get_node(rag, node_id)
+            logger.info("Deleting node with ID: %s", node_id)
 
-            # Call LightRAG to delete the node
+            # Call LightRAG to delete the node; it reports a missing node itself,
+            # by raising a KeyError or returning nothing
             result = await rag.delete_node(node_id=node_id)
 
+            if not result:
+                raise _node_not_found(node_id)
+
             return {
                 "id": node_id,
                 "deleted": True,
@@ -200,11 +362,15 @@ class GraphService:
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error deleting node {node_id}: {str(e)}")
+            if _is_not_found(e):
+                raise _node_not_found(node_id)
+            logger.error("Error deleting node %s: %s", node_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error deleting node: {str(e)}",
             )
+        finally:
+            GraphService.invalidate_cache(rag)
 
     @staticmethod
     async def create_edge(
@@ -224,13 +390,11 @@ class GraphService:
             Created edge data
         """
         try:
-            logger.info(f"Creating edge from {source} to {target} of type {edge_type}")
-
-            # Verify source and target nodes exist
-            await GraphService.get_node(rag, source)
-            await GraphService.get_node(rag, target)
+            logger.info(
+                "Creating edge from %s to %s of type %s", source, target, edge_type
+            )
 
-            # Call LightRAG to create the edge
+            # Call LightRAG to create the edge; it rejects missing endpoints itself
             edge = await rag.create_edge(
                 source_id=source,
                 target_id=target,
@@ -238,15 +402,32 @@ class GraphService:
                 properties=properties,
             )
 
+            if not edge:
+                # Some storages return nothing instead of raising
+                missing = await GraphService._find_missing_node(rag, source, target)
+                if missing is not None:
+                    raise _node_not_found(missing)
+
             return edge
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error creating edge: {str(e)}")
+            if _is_not_found(e):
+                # Only pay for the lookups once we know an endpoint is missing
+                missing = await GraphService._find_missing_node(rag, source, target)
+                if missing is not None:
+                    raise _node_not_found(missing)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Source or target node not found: {str(e)}",
+                )
+            logger.error("Error creating edge: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error creating edge: {str(e)}",
             )
+        finally:
+            GraphService.invalidate_cache(rag)
 
     @staticmethod
     async def update_edge(
@@ -272,7 +453,9 @@ class GraphService:
             Updated edge data
         """
         try:
-            logger.info(f"Updating edge from {source} to {target} of type {edge_type}")
+            logger.info(
+                "Updating edge from %s to %s of type %s", source, target, edge_type
+            )
 
             # Prepare the update data
             update_data = {}
@@ -289,11 +472,13 @@ class GraphService:
 
             return edge
         except Exception as e:
-            logger.error(f"Error updating edge: {str(e)}")
+            logger.error("Error updating edge: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error updating edge: {str(e)}",
             )
+        finally:
+            GraphService.invalidate_cache(rag)
 
     @staticmethod
     async def delete_edge(
@@ -312,7 +497,9 @@ class GraphService:
             Deletion result
         """
         try:
-            logger.info(f"Deleting edge from {source} to {target} of type {edge_type}")
+            logger.info(
+                "Deleting edge from %s to %s of type %s", source, target, edge_type
+            )
 
             # Call LightRAG to delete the edge
             await rag.delete_edge(
@@ -326,11 +513,13 @@ class GraphService:
                 "deleted": True,
             }
         except Exception as e:
-            logger.error(f"Error deleting edge: {str(e)}")
+            logger.error("Error deleting edge: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error deleting edge: {str(e)}",
             )
+        finally:
+            GraphService.invalidate_cache(rag)
 
     @staticmethod
     async def traverse_graph(
@@ -358,14 +547,23 @@ class GraphService:
             Subgraph with nodes and edges
         """
         try:
+            # Walk the graph here when the backend has no traversal of its own
+            if not hasattr(rag, "traverse_graph"):
+                return await GraphService.traverse_graph_parallel(
+                    rag,
+                    start_node=start_node,
+                    direction=direction,
+                    max_depth=max_depth,
+                    edge_types=edge_types,
+                    node_labels=node_labels,
+                    limit=limit,
+                )
+
             logger.info(
-                f"Traversing graph from node {start_node} with depth {max_depth}"
+                "Traversing graph from node %s with depth %s", start_node, max_depth
             )
 
-            # Verify start node exists
-            await GraphService.get_node(rag, start_node)
-
-            # Call LightRAG to traverse the graph
+            # Call LightRAG to traverse the graph; it rejects a missing start node itself
             subgraph = await rag.traverse_graph(
                 start_node=start_node,
                 direction=direction,
@@ -375,17 +573,135 @@ class GraphService:
                 limit=limit,
             )
 
+            # A traversal from an existing node includes at least that node,
+            # so only an empty result needs the lookup
+            if not subgraph or not subgraph.get("nodes"):
+                if await GraphService._find_missing_node(rag, start_node):
+                    raise _node_not_found(start_node)
+
             # Format the response
+            return _subgraph_response(subgraph or {})
+        except HTTPException:
+            raise
+        except Exception as e:
+            if _is_not_found(e):
+                raise _node_not_found(start_node)
+            logger.error("Error traversing graph: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error traversing graph: {str(e)}",
+            )
+
+    @staticmethod
+    async def traverse_graph_parallel(
+        rag,
+        start_node: str,
+        direction: str,
+        max_depth: int,
+        edge_types: Optional[List[str]] = None,
+        node_labels: Optional[List[str]] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        Traverse the graph breadth-first, expanding each level concurrently
+
+        The edges of every node in the current frontier are fetched in one
+        concurrent batch, as are the newly reached nodes, so a traversal of
+        depth D takes 2D round trips however wide the graph is.
+
+        Args:
+            rag: The LightRAG instance
+            start_node: ID of the node to start from
+            direction: Direction of traversal (outgoing/outbound, incoming/inbound, both/any)
+            max_depth: Maximum traversal depth
+            edge_types: Optional list of edge types to traverse
+            node_labels: Optional list of node labels to include
+            limit: Maximum number of nodes to return
+
+        Returns:
+            Subgraph with nodes and edges
+        """
+        try:
+            logger.info(
+                "Traversing graph level by level from node %s with depth %s",
+                start_node,
+                max_depth,
+            )
+
+            direction = direction.lower()
+            follow_out = direction in ("outgoing", "outbound", "both", "any")
+            follow_in = direction in ("incoming", "inbound", "both", "any")
+            edge_type_set = set(edge_types) if edge_types else None
+            label_set = set(node_labels) if node_labels else None
+
+            start = await rag.get_node(node_id=start_node)
+            if not start:
+                raise _node_not_found(start_node)
+
+            nodes = {start_node: start}
+            edges = {}
+            frontier = [start_node]
+
+            for _ in range(max_depth):
+                if not frontier or len(nodes) >= limit:
+                    break
+
+                edge_lists = await asyncio.gather(
+                    *(rag.get_node_edges(node_id=node_id) for node_id in frontier)
+                )
+
+                # Group the followed edges by the neighbor they lead to
+                reached: Dict[str, List[Dict[str, Any]]] = {}
+                for node_id, node_edges in zip(frontier, edge_lists):
+                    for edge in node_edges or ():
+                        if edge_type_set and edge.get("type") not in edge_type_set:
+                            continue
+
+                        if follow_out and edge.get("source") == node_id:
+                            neighbor = edge.get("target")
+                        elif follow_in and edge.get("target") == node_id:
+                            neighbor = edge.get("source")
+                        else:
+                            continue
+                        reached.setdefault(neighbor, []).append(edge)
+
+                new_ids = [node_id for node_id in reached if node_id not in nodes]
+                new_nodes = await asyncio.gather(
+                    *(rag.get_node(node_id=node_id) for node_id in new_ids)
+                )
+
+                frontier = []
+                for node_id, node in zip(new_ids, new_nodes):
+                    if len(nodes) >= limit:
+                        break
+                    if not node or (label_set and node.get("label") not in label_set):
+                        continue
+                    nodes[node_id] = node
+                    frontier.append(node_id)
+
+                # Keep the edges whose both ends made it into the result
+                for node_id, node_edges in reached.items():
+                    if node_id in nodes:
+                        for edge in node_edges:
+                            key = (
+                                edge.get("source"),
+                                edge.get("type"),
+                                edge.get("target"),
+                            )
+                            edges.setdefault(key, edge)
+
             return {
-                "nodes": subgraph.get("nodes", []),
-                "edges": subgraph.get("edges", []),
-                "total_nodes": len(subgraph.get("nodes", [])),
-                "total_edges": len(subgraph.get("edges", [])),
+                "nodes": list(nodes.values()),
+                "edges": list(edges.values()),
+                "total_nodes": len(nodes),
+                "total_edges": len(edges),
             }
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error traversing graph: {str(e)}")
+            if _is_not_found(e):
+                raise _node_not_found(start_node)
+            logger.error("Error traversing graph: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error traversing graph: {str(e)}",
@@ -414,14 +730,13 @@ class GraphService:
         """
         try:
             logger.info(
-                f"Finding paths from {start_node} to {end_node} with max depth {max_depth}"
+                "Finding paths from %s to %s with max depth %s",
+                start_node,
+                end_node,
+                max_depth,
             )
 
-            # Verify nodes exist
-            await GraphService.get_node(rag, start_node)
-            await GraphService.get_node(rag, end_node)
-
-            # Call LightRAG to find paths
+            # Call LightRAG to find paths; it rejects missing endpoints itself
             paths = await rag.find_paths(
                 start_node=start_node,
                 end_node=end_node,
@@ -429,11 +744,30 @@ class GraphService:
                 edge_types=edge_types,
             )
 
+            # No paths may also mean an endpoint is missing
+            if not paths:
+                missing = await GraphService._find_missing_node(
+                    rag, start_node, end_node
+                )
+                if missing is not None:
+                    raise _node_not_found(missing)
+                paths = []
+
             return {"paths": paths, "count": len(paths)}
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error finding paths: {str(e)}")
+            if _is_not_found(e):
+                missing = await GraphService._find_missing_node(
+                    rag, start_node, end_node
+                )
+                if missing is not None:
+                    raise _node_not_found(missing)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Start or end node not found: {str(e)}",
+                )
+            logger.error("Error finding paths: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error finding paths: {str(e)}",
@@ -456,20 +790,23 @@ class GraphService:
             Subgraph with nodes and edges matching the query
         """
         try:
-            logger.info(f"Searching graph with query: {query}")
+            cache = _graph_cache(rag)
+            cache_key = ("search", query, limit, offset)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            logger.info("Searching graph with query: %s", query)
 
             # Call LightRAG to search the graph
             results = await rag.search_graph(query=query, limit=limit, offset=offset)
 
             # Format the response
-            return {
-                "nodes": results.get("nodes", []),
-                "edges": results.get("edges", []),
-                "total_nodes": len(results.get("nodes", [])),
-                "total_edges": len(results.get("edges", [])),
-            }
+            result = _subgraph_response(results)
+            cache.put(cache_key, result)
+            return result
         except Exception as e:
-            logger.error(f"Error searching graph: {str(e)}")
+            logger.error("Error searching graph: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error searching graph: {str(e)}",
@@ -489,104 +826,4 @@ class GraphService:
         Returns:
             Formatted graph data
         """
-        nodes = graph_data.get("nodes", [])
-        edges = graph_data.get("edges", [])
-
-        if format == "d3":
-            return {
-                "nodes": [
-                    {
-                        "id": node.get("id"),
-                        "label": node.get("label"),
-                        "group": node.get("label"),
-                        **node.get("properties", {}),
-                    }
-                    for node in nodes
-                ],
-                "links": [
-                    {
-                        "source": edge.get("source"),
-                        "target": edge.get("target"),
-                        "type": edge.get("type"),
-                        "value": 1,
-                        **edge.get("properties", {}),
-                    }
-                    for edge in edges
-                ],
-            }
-        elif format == "cytoscape":
-            return {
-                "elements": {
-                    "nodes": [
-                        {
-                            "data": {
-                                "id": node.get("id"),
-                                "label": node.get("label"),
-                                **node.get("properties", {}),
-                            }
-                        }
-                        for node in nodes
-                    ],
-                    "edges": [
-                        {
-                            "data": {
-                                "id": f"{edge.get('source')}-{edge.get('type')}-{edge.get('target')}",
-                                "source": edge.get("source"),
-                                "target": edge.get("target"),
-                                "label": edge.get("type"),
-                                **edge.get("properties", {}),
-                            }
-                        }
-                        for edge in edges
-                    ],
-                }
-            }
-        elif format == "jsonld":
-            # JSON-LD format
-            context = {
-                "@context": {
-                    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
-                    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
-                    "xsd": "http://www.w3.org/2001/XMLSchema#",
-                    "label": "rdfs:label",
-                    "type": "rdf:type",
-                    "property": "rdf:Property",
-                }
-            }
-
-            graph = []
-
-            # Add nodes
-            for node in nodes:
-                node_obj = {
-                    "@id": node.get("id"),
-                    "type": node.get("label"),
-                    "label": node.get("label"),
-                }
-
-                # Add properties
-                for key, value in node.get("properties", {}).items():
-                    node_obj[key] = value
-
-                graph.append(node_obj)
-
-            # Add edges
-            for edge in edges:
-                edge_obj = {
-                    "@id": f"{edge.get('source')}-{edge.get('type')}-{edge.get('target')}",
-                    "type": "property",
-                    "label": edge.get("type"),
-                    "source": {"@id": edge.get("source")},
-                    "target": {"@id": edge.get("target")},
-                }
-
-                # Add properties
-                for key, value in edge.get("properties", {}).items():
-                    edge_obj[key] = value
-
-                graph.append(edge_obj)
-
-            return {**context, "@graph": graph}
-        else:
-            # Default format - just return the original data
-            return graph_data
+        return format_graph(graph_data, format)
@@ -0,0 +1,138 @@
+"""
+Dynamic batching of document ingestion jobs
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of documents submitted to LightRAG in one batch
+INGEST_BATCH_SIZE = 16
+
+# How long to wait for more documents before submitting a partial batch (in seconds)
+INGEST_BATCH_TIMEOUT = 0.2
+
+# Number of batches ingested concurrently across all users
+INGEST_WORKERS = 4
+
+
+class IngestionBatcher:
+    """
+    Coalesces ingestion jobs that arrive close together into per-user batches,
+    so LightRAG receives one insert call per batch instead of one per document.
+
+    Batches are processed by a fixed pool of workers, so a burst of uploads
+    can't start an unbounded number of ingestions at once. A user is handled
+    by at most one worker at a time, which keeps their jobs in order.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[str, List[Any]], Awaitable[None]],
+        batch_size: int = INGEST_BATCH_SIZE,
+        wait_timeout: float = INGEST_BATCH_TIMEOUT,
+        max_workers: int = INGEST_WORKERS,
+    ):
+        """
+        Initialize the batcher
+
+        Args:
+            process_batch: Coroutine function called with (user_id, jobs) for each batch
+            batch_size: Maximum number of jobs per batch
+            wait_timeout: Time to wait for more jobs before processing a partial batch
+            max_workers: Number of batches processed concurrently
+        """
+        self.process_batch = process_batch
+        self.batch_size = batch_size
+        self.wait_timeout = wait_timeout
+        self.max_workers = max_workers
+        self._pending: Dict[str, Deque[Any]] = {}
+        self._scheduled: Set[str] = set()
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def submit(self, user_id: str, job: Any) -> None:
+        """
+        Queue a job for a user, scheduling the user if they aren't already
+
+        Args:
+            user_id: The user ID
+            job: The job to process
+        """
+        self._pending.setdefault(user_id, deque()).append(job)
+        self._start_workers()
+
+        if user_id not in self._scheduled:
+            self._scheduled.add(user_id)
+            self._ready.put_nowait(user_id)
+
+    async def join(self) -> None:
+        """Wait until every submitted job has been processed"""
+        if self._ready is not None:
+            await self._ready.join()
+
+    async def stop(self) -> None:
+        """Cancel the workers, dropping any jobs that haven't started"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        self._workers = []
+        self._ready = None
+        self._pending.clear()
+        self._scheduled.clear()
+
+    def _start_workers(self) -> None:
+        """Start the worker pool on first use, inside the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._workers and self._workers[0].get_loop() is loop:
+            return
+
+        # Workers left over from a closed event loop (e.g. between test
+        # clients) can never run again, so start a fresh pool
+        self._scheduled.clear()
+
+        self._ready = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_workers)
+        ]
+
+    async def _worker(self) -> None:
+        """Process one batch at a time for whichever user is next in line"""
+        while True:
+            user_id = await self._ready.get()
+            try:
+                await self._run_batch(user_id)
+            finally:
+                self._ready.task_done()
+
+    async def _run_batch(self, user_id: str) -> None:
+        """
+        Process the next batch of a user's pending jobs
+
+        Args:
+            user_id: The user ID
+        """
+        pending = self._pending[user_id]
+
+        # Give closely spaced jobs a chance to join the batch
+        if len(pending) < self.batch_size:
+            await asyncio.sleep(self.wait_timeout)
+
+        batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+
+        try:
+            await self.process_batch(user_id, batch)
+        except Exception as e:
+            logger.error(f"Error processing ingestion batch for user {user_id}: {e}")
+        finally:
+            # Requeue the user behind everyone else so one busy user
+            # can't monopolise a worker
+            if pending:
+                self._ready.put_nowait(user_id)
+            else:
+                self._scheduled.discard(user_id)
+                self._pending.pop(user_id, None)
@@ -1,13 +1,18 @@
 import os
 import logging
-import shutil
 import asyncio
-from typing import Dict, Any, Optional, Callable
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, Any, Iterator, List, Optional, Callable, Set
 from collections import OrderedDict
-from app.config import DATA_DIR, VECTOR_DIMENSION, MAX_TOKEN_SIZE
+import numpy as np
+from app.config import DATA_DIR, VECTOR_DIMENSION, MAX_TOKEN_SIZE, CHUNK_SIZE
 from app.utilities.lightrag_utils import (
     initialize_lightrag_instance,
 )
+from app.services.embedding_batcher import EmbeddingBatcher
 
 # Import LightRAG-related packages
 try:
@@ -42,17 +47,50 @@ except ImportError:
         return "This is a mock response from gpt_4o_mini_complete"
 
     def openai_embed(texts):
-        # Return an array of the correct dimension for each text
-        return [
-            [0.0] * VECTOR_DIMENSION
-            for _ in range(len(texts) if isinstance(texts, list) else 1)
-        ]
+        # Return a zero vector of the correct dimension for each text, as one
+        # contiguous array like the real function does
+        count = len(texts) if isinstance(texts, list) else 1
+        return np.zeros((count, VECTOR_DIMENSION), dtype=np.float32)
 
     LIGHTRAG_INSTALLED = False
 
 
 logger = logging.getLogger(__name__)
 
+# Weights of the eviction score: time since last use, unlikelihood of reuse,
+# and working directory size
+EVICTION_RECENCY_WEIGHT = 0.3
+EVICTION_REUSE_WEIGHT = 0.5
+EVICTION_SIZE_WEIGHT = 0.2
+
+# Instances unused for this long are evicted even when there is room (in seconds)
+INSTANCE_IDLE_TTL = 900
+
+# How often idle instances are looked for (in seconds)
+INSTANCE_SWEEP_INTERVAL = 60
+
+
+@dataclass
+class UserStat:
+    """Usage statistics of a cached LightRAG instance, used to pick eviction victims"""
+
+    created_at: float = field(default_factory=time.monotonic)
+    last_access: float = field(default_factory=time.monotonic)
+    hit_count: int = 0
+    size_bytes: Optional[int] = None
+
+
+def _dir_size(path: str) -> int:
+    """Get the total size of the files under a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
 
 class RAGInstanceManager:
     """
@@ -74,11 +112,75 @@ class RAGInstanceManager:
         self.max_instances = max_instances
         self.instances: Dict[str, LightRAG] = {}
 
+        # Per-user locks so concurrent first requests build an instance only once
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+
+        # Use counts of instances that are in the middle of an operation
+        self._in_use: Dict[str, int] = {}
+
+        # User directories known to exist, so makedirs runs once per user
+        self._dirs_created: Set[str] = set()
+
+        # The API key is read once; every instance shares the same model functions
+        self._openai_api_key = os.environ.get("OPENAI_API_KEY")
+        self._mock_mode = self._openai_api_key is None and LIGHTRAG_INSTALLED
+
         logger.info(f"Initialized RAGInstanceManager with base_dir={base_dir}")
 
-    def get_instance(self, user_id: str) -> LightRAG:
+    @contextmanager
+    def in_use(self, user_id: str) -> Iterator[None]:
+        """
+        Protect a user's instance from eviction while an operation runs on it
+
+        Args:
+            user_id: The user ID
+        """
+        self._in_use[user_id] = self._in_use.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self._in_use[user_id] - 1
+            if remaining:
+                self._in_use[user_id] = remaining
+            else:
+                del self._in_use[user_id]
+
+    def _cached_instance(self, user_id: str) -> Optional[LightRAG]:
         """
-        Get or create a LightRAG instance for a specific user
+        Look up an already created instance
+
+        Args:
+            user_id: The user ID
+
+        Returns:
+            The user's LightRAG instance, or None if it hasn't been created
+        """
+        return self.instances.get(user_id)
+
+    async def _make_room(self) -> None:
+        """Free capacity before a new instance is created"""
+
+    async def refresh_size(self, user_id: str) -> None:
+        """
+        Re-measure a user's working directory, e.g. after ingesting documents
+
+        Args:
+            user_id: The user ID
+        """
+
+    async def stop(self) -> None:
+        """Stop any background tasks started by the manager"""
+        # Only stop the embedding batcher if it was ever created
+        batcher = self.__dict__.get("_embedding_batcher")
+        if batcher is not None:
+            await batcher.stop()
+
+    async def aget_instance(self, user_id: str) -> LightRAG:
+        """
+        Get or create a LightRAG instance for a user
+
+        Concurrent calls for a user whose instance doesn't exist yet wait for a
+        single build instead of each creating their own instance.
 
         Args:
             user_id: The user ID
@@ -86,22 +188,69 @@ class RAGInstanceManager:
         Returns:
             A LightRAG instance
         """
-        if user_id in self.instances:
-            logger.info(f"Returning existing RAG instance for user {user_id}")
-            return self.instances[user_id]
+        rag = self._cached_instance(user_id)
+        if rag is not None:
+            return rag
+
+        lock = self._build_locks.setdefault(user_id, asyncio.Lock())
+        try:
+            async with lock:
+                # Another request may have built it while we waited
+                rag = self.instances.get(user_id)
+                if rag is not None:
+                    return rag
+
+                logger.info(f"Creating new RAG instance for user {user_id}")
+                await self._make_room()
+                return await self.create_instance_async(user_id)
+        finally:
+            # Waiters re-check the cache once they get the lock, so the lock
+            # can be dropped as soon as the build is done
+            if self._build_locks.get(user_id) is lock:
+                del self._build_locks[user_id]
+
+    def get_instance(self, user_id: str) -> LightRAG:
+        """
+        Get or create a LightRAG instance from synchronous code
 
-        # Create a new instance
-        logger.info(f"Creating new RAG instance for user {user_id}")
+        Only for scripts and tests without an event loop; async code must
+        await aget_instance, since a second loop would share the storage
+        connection pools with the running one.
 
-        # For synchronous usage, run the async creation in a new event loop
+        Args:
+            user_id: The user ID
+
+        Returns:
+            A LightRAG instance
+
+        Raises:
+            RuntimeError: If called while an event loop is running
+        """
         try:
-            loop = asyncio.get_event_loop()
+            asyncio.get_running_loop()
         except RuntimeError:
-            # If no event loop exists (e.g., in a non-async context), create one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            return asyncio.run(self.aget_instance(user_id))
 
-        return loop.run_until_complete(self.create_instance_async(user_id))
+        raise RuntimeError(
+            "get_instance() cannot be called from a running event loop; "
+            "use 'await aget_instance()' instead"
+        )
+
+    def _ensure_user_dir(self, user_id: str) -> str:
+        """
+        Create a user's working directory, once per manager
+
+        Args:
+            user_id: The user ID
+
+        Returns:
+            The path to the user directory
+        """
+        user_dir = os.path.join(self.base_dir, user_id)
+        if user_dir not in self._dirs_created:
+            os.makedirs(user_dir, exist_ok=True)
+            self._dirs_created.add(user_dir)
+        return user_dir
 
     async def create_instance_async(self, user_id: str) -> LightRAG:
         """
@@ -117,8 +266,7 @@ class RAGInstanceManager:
             A new LightRAG instance
         """
         # Create user directory if it doesn't exist
-        user_dir = os.path.join(self.base_dir, user_id)
-        os.makedirs(user_dir, exist_ok=True)
+        user_dir = self._ensure_user_dir(user_id)
 
         try:
             # Initialize LightRAG with user-specific directory using async initialization
@@ -153,14 +301,14 @@ class RAGInstanceManager:
         logger.warning(f"Using fallback initialization for user {user_id}")
 
         # Create user directory if it doesn't exist
-        user_dir = os.path.join(self.base_dir, user_id)
-        os.makedirs(user_dir, exist_ok=True)
+        user_dir = self._ensure_user_dir(user_id)
 
         # Initialize LightRAG with user-specific directory
         rag = LightRAG(
             working_dir=user_dir,
             llm_model_func=self.get_llm_model_func(),
             embedding_func=self.get_embedding_func(),
+            chunk_token_size=CHUNK_SIZE,
             # enable_llm_cache_for_entity_extract=True,
             kv_storage="PGKVStorage",
             doc_status_storage="PGDocStatusStorage",
@@ -183,17 +331,30 @@ class RAGInstanceManager:
         Returns:
             True if successfully cleaned up, False otherwise
         """
-        if user_id not in self.instances:
+        instance = self.instances.pop(user_id, None)
+        if instance is None:
             logger.warning(f"No instance found for user {user_id} during cleanup")
             return False
 
-        try:
-            # Remove from instances dict
-            instance = self.instances.pop(user_id)
+        return self._release_resources(user_id, instance)
 
-            # Any additional cleanup that might be needed for the instance
-            # For example, closing connections or releasing resources
-            # This would depend on the LightRAG API
+    def _release_resources(self, user_id: str, instance: LightRAG) -> bool:
+        """
+        Release the resources held by an instance that is no longer tracked
+
+        Args:
+            user_id: The user ID
+            instance: The LightRAG instance
+
+        Returns:
+            True if successfully cleaned up, False otherwise
+        """
+        try:
+            # The instance's PG storages hold references to the connection pool
+            # that LightRAG shares across the process. They are deliberately
+            # not finalized: dropping the last reference would close the pool,
+            # and the next instance would have to reconnect and re-check the
+            # schema. Dropping the instance only frees the in-memory wrapper.
 
             logger.info(f"Cleaned up RAG instance for user {user_id}")
             return True
@@ -205,14 +366,30 @@ class RAGInstanceManager:
         """
         Get the LLM model function for LightRAG with OpenAI's multilingual models
 
-        This function configures and returns the LLM model function for use with LightRAG.
-        It uses OpenAI's GPT models which have strong multilingual capabilities.
-
         Returns:
             A callable function for LLM model completions
         """
+        return self.llm_model_func
+
+    def get_embedding_func(self) -> EmbeddingFunc:
+        """
+        Get the embedding function for LightRAG using OpenAI's multilingual embedding model
+
+        Returns:
+            An EmbeddingFunc instance configured for OpenAI embeddings
+        """
+        return self.embedding_func
+
+    @cached_property
+    def llm_model_func(self) -> Callable:
+        """
+        LLM model function shared by every LightRAG instance
+
+        It uses OpenAI's GPT models which have strong multilingual capabilities,
+        or a mock function if no API key is configured.
+        """
         # Check if OpenAI API key is configured
-        if "OPENAI_API_KEY" not in os.environ and LIGHTRAG_INSTALLED:
+        if self._mock_mode:
             logger.warning(
                 "OPENAI_API_KEY not set in environment variables. Using mock LLM function."
             )
@@ -227,6 +404,7 @@ class RAGInstanceManager:
         # This is a function from LightRAG that uses OpenAI's API
         # The function has multilingual capabilities
         logger.info("Using OpenAI GPT-4o mini for LLM completions")
+        api_key = self._openai_api_key
 
         async def my_llm_model_func(
             prompt: str,
@@ -235,25 +413,23 @@ class RAGInstanceManager:
             return await gpt_4o_mini_complete(
                 prompt=prompt,
                 base_url="https://api.openai.com/v1",
-                api_key=os.getenv("OPENAI_API_KEY"),
+                api_key=api_key,
                 **kwargs,
             )
 
         return my_llm_model_func
 
-    def get_embedding_func(self) -> EmbeddingFunc:
+    @cached_property
+    def embedding_func(self) -> EmbeddingFunc:
         """
-        Get the embedding function for LightRAG using OpenAI's multilingual embedding model
-
-        This function configures and returns an embedding function wrapped in LightRAG's
-        EmbeddingFunc class. It uses OpenAI's text-embedding-3-large model which has
-        excellent multilingual capabilities.
+        Embedding function shared by every LightRAG instance
 
-        Returns:
-            An EmbeddingFunc instance configured for OpenAI embeddings
+        It uses OpenAI's text-embedding-3-large model which has excellent
+        multilingual capabilities, or a mock function if no API key is configured.
+        EmbeddingFunc is stateless, so one object serves all users.
         """
         # Check if OpenAI API key is configured
-        if "OPENAI_API_KEY" not in os.environ and LIGHTRAG_INSTALLED:
+        if self._mock_mode:
             logger.warning(
                 "OPENAI_API_KEY not set in environment variables. Using mock embedding function."
             )
@@ -271,13 +447,19 @@ class RAGInstanceManager:
         logger.info(f"Using OpenAI embeddings with dimension={VECTOR_DIMENSION}")
 
         # Return the actual OpenAI embedding function wrapped in EmbeddingFunc
-        # The OpenAI embedding models have strong multilingual capabilities
+        # The OpenAI embedding models have strong multilingual capabilities.
+        # Concurrent calls from all users are merged into batched requests
         return EmbeddingFunc(
             embedding_dim=VECTOR_DIMENSION,  # 1536 for text-embedding-3-large
             max_token_size=MAX_TOKEN_SIZE,  # 8192 as specified in the PRD
-            func=openai_embed,
+            func=self._embedding_batcher.embed,
         )
 
+    @cached_property
+    def _embedding_batcher(self) -> EmbeddingBatcher:
+        """Batcher that coalesces OpenAI embedding calls across instances"""
+        return EmbeddingBatcher(openai_embed)
+
 
 class LRURAGManager(RAGInstanceManager):
     """
@@ -294,13 +476,21 @@ class LRURAGManager(RAGInstanceManager):
             max_instances: Maximum number of instances to keep in memory
         """
         super().__init__(base_dir, database_url, max_instances)
-        self.lru_order = []
+
+        # Instances ordered from least to most recently used
+        self.instances: "OrderedDict[str, LightRAG]" = OrderedDict()
+        self.stats: Dict[str, UserStat] = {}
+        self.hits = 0
+        self.misses = 0
+
+        # Background task evicting idle instances, started on first use
+        self._sweeper: Optional[asyncio.Task] = None
 
         logger.info(f"Initialized LRURAGManager with max_instances={max_instances}")
 
-    def get_instance(self, user_id: str) -> LightRAG:
+    async def aget_instance(self, user_id: str) -> LightRAG:
         """
-        Get or create a LightRAG instance with LRU caching
+        Get or create a LightRAG instance for a user
 
         Args:
             user_id: The user ID
@@ -308,30 +498,189 @@ class LRURAGManager(RAGInstanceManager):
         Returns:
             A LightRAG instance
         """
-        if user_id in self.instances:
-            # Move to the end of LRU list (most recently used)
-            if user_id in self.lru_order:
-                self.lru_order.remove(user_id)
-            self.lru_order.append(user_id)
-            return self.instances[user_id]
+        self._start_sweeper()
+        return await super().aget_instance(user_id)
 
-        # If we're at capacity, remove least recently used instance
-        if len(self.instances) >= self.max_instances and self.lru_order:
-            lru_user = self.lru_order.pop(0)
-            self.cleanup_instance(lru_user)
+    def evict_idle(self, max_idle: float = INSTANCE_IDLE_TTL) -> List[str]:
+        """
+        Evict instances that haven't been used recently
 
-        # Create new instance
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        Args:
+            max_idle: Time since last use after which an instance is evicted (in seconds)
+
+        Returns:
+            The user IDs whose instances were evicted
+        """
+        now = time.monotonic()
+        evicted = []
+        for user_id in list(self.instances):
+            if user_id in self._in_use or user_id in self._build_locks:
+                continue
+
+            stat = self.stats.get(user_id)
+            if stat is not None and now - stat.last_access > max_idle:
+                self._release_resources(user_id, self.instances.pop(user_id))
+                evicted.append(user_id)
+
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} idle RAG instances")
+        return evicted
+
+    async def stop(self) -> None:
+        """Cancel the idle instance sweeper and the manager's other background tasks"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+        await super().stop()
+
+    def _start_sweeper(self) -> None:
+        """Start the idle instance sweeper in the running event loop"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._sweeper is not None
+            and not self._sweeper.done()
+            and self._sweeper.get_loop() is loop
+        ):
+            return
+
+        # A sweeper left over from a closed event loop can never run again
+        self._sweeper = loop.create_task(self._sweep_idle_instances())
 
-        rag = loop.run_until_complete(self.create_instance_async(user_id))
+    async def _sweep_idle_instances(self) -> None:
+        """Periodically evict idle instances"""
+        while True:
+            await asyncio.sleep(INSTANCE_SWEEP_INTERVAL)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Error evicting idle RAG instances: {e}")
+
+    def _cached_instance(self, user_id: str) -> Optional[LightRAG]:
+        """
+        Look up an already created instance, marking it as most recently used
 
-        self.lru_order.append(user_id)
+        Args:
+            user_id: The user ID
+
+        Returns:
+            The user's LightRAG instance, or None if it hasn't been created
+        """
+        stat = self.stats.setdefault(user_id, UserStat())
+        stat.last_access = time.monotonic()
+
+        rag = self.instances.get(user_id)
+        if rag is None:
+            self.misses += 1
+            return None
+
+        self.instances.move_to_end(user_id)
+        self.hits += 1
+        stat.hit_count += 1
         return rag
 
+    def _eviction_victim(self) -> Optional[str]:
+        """
+        Pick the instance to evict
+
+        Scores every idle instance on how long ago it was used, how unlikely
+        it is to be reused (from its hit rate) and how large its working
+        directory is, and picks the highest score. Instances in use are
+        never picked. Sizes are the last measured ones (see _measure_sizes);
+        nothing is read from disk here.
+
+        Returns:
+            The user ID to evict, or None if every instance is in use
+        """
+        now = time.monotonic()
+        candidates = []
+        for user_id in self.instances:
+            if user_id in self._in_use:
+                continue
+
+            stat = self.stats.setdefault(user_id, UserStat())
+            idle = now - stat.last_access
+            reuse_rate = stat.hit_count / (now - stat.created_at + 1.0)
+            candidates.append((user_id, idle, reuse_rate, stat.size_bytes or 0))
+
+        if not candidates:
+            return None
+
+        max_idle = max(c[1] for c in candidates) or 1.0
+        max_rate = max(c[2] for c in candidates) or 1.0
+        max_size = max(c[3] for c in candidates) or 1
+
+        def score(candidate) -> float:
+            _, idle, reuse_rate, size = candidate
+            return (
+                EVICTION_RECENCY_WEIGHT * idle / max_idle
+                + EVICTION_REUSE_WEIGHT * (1.0 - reuse_rate / max_rate)
+                + EVICTION_SIZE_WEIGHT * size / max_size
+            )
+
+        # Candidates are in recency order, so ties go to the least recently used
+        return max(candidates, key=score)[0]
+
+    async def refresh_size(self, user_id: str) -> None:
+        """
+        Re-measure a user's working directory, e.g. after ingesting documents
+
+        The directory is walked in a worker thread to keep the event loop free.
+
+        Args:
+            user_id: The user ID
+        """
+        size = await asyncio.to_thread(
+            _dir_size, os.path.join(self.base_dir, user_id)
+        )
+        stat = self.stats.get(user_id)
+        if stat is not None:
+            stat.size_bytes = size
+
+    async def _measure_sizes(self) -> None:
+        """Measure the working directories of instances never measured before"""
+        unmeasured = [
+            user_id
+            for user_id in self.instances
+            if user_id not in self._in_use
+            and self.stats.setdefault(user_id, UserStat()).size_bytes is None
+        ]
+        await asyncio.gather(*(self.refresh_size(user_id) for user_id in unmeasured))
+
+    async def _make_room(self) -> None:
+        """Evict instances until there is room for one more"""
+        if len(self.instances) < self.max_instances:
+            return
+
+        await self._measure_sizes()
+        while self.instances and len(self.instances) >= self.max_instances:
+            victim = self._eviction_victim()
+            if victim is None:
+                # Everything is busy; go over capacity rather than break a request
+                logger.warning("All RAG instances are in use, exceeding max_instances")
+                return
+            self._release_resources(victim, self.instances.pop(victim))
+
+    def _release_resources(self, user_id: str, instance: LightRAG) -> bool:
+        """Drop a user's usage statistics along with the instance"""
+        self.stats.pop(user_id, None)
+        return super()._release_resources(user_id, instance)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Get instance cache statistics
+
+        Returns:
+            Dictionary with hit, miss and size counts
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.instances),
+            "max_instances": self.max_instances,
+        }
+
 
 # Singleton manager instance
 _manager = None
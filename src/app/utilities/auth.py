@@ -1,17 +1,205 @@
+import asyncio
 import logging
 import json
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, NamedTuple, Optional, Any
 import httpx
-from jose import jwt, jwk, JWTError
+import jwt
+from jwt import InvalidTokenError, PyJWK
 from fastapi import HTTPException, status
 from app.config import AUTH0_DOMAIN, AUTH0_API_AUDIENCE
 
 logger = logging.getLogger(__name__)
 
-# Cache for Auth0 public keys
-_jwks_cache: Optional[Dict[str, Any]] = None
 _jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
 
+# How long to keep the keys when the JWKS response has no max-age (in seconds)
+JWKS_DEFAULT_TTL = 3600
+
+# How long to keep serving stale keys after a failed refresh (in seconds)
+JWKS_RETRY_AFTER = 60
+
+# Minimum time between refreshes forced by tokens with an unknown key ID (in seconds)
+JWKS_MIN_REFRESH_INTERVAL = 30
+
+# Timeout for JWKS requests (in seconds)
+JWKS_TIMEOUT = 5
+
+# Client shared by every JWKS request, so refreshes reuse the connection
+# instead of doing a new TLS handshake each time
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=JWKS_TIMEOUT)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client, e.g. on application shutdown"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _max_age(cache_control: Optional[str]) -> int:
+    """
+    Get the max-age of a Cache-Control header
+
+    Args:
+        cache_control: Cache-Control header value
+
+    Returns:
+        The max-age in seconds, or the default TTL if there is none
+    """
+    for directive in (cache_control or "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() == "max-age":
+            try:
+                return int(value)
+            except ValueError:
+                break
+    return JWKS_DEFAULT_TTL
+
+
+class SigningKey(NamedTuple):
+    """Public key of a JWKS entry, ready for token verification"""
+
+    key: Any
+    alg: str
+
+
+def _index_keys(jwks: Dict[str, Any]) -> Dict[str, SigningKey]:
+    """
+    Load the keys of a JWKS, indexed by key ID
+
+    Args:
+        jwks: JSON Web Key Set
+
+    Returns:
+        Dictionary mapping each key ID to its signing key
+    """
+    keys_by_kid = {}
+    for key in jwks.get("keys", []):
+        kid = key.get("kid")
+        if not kid:
+            continue
+        try:
+            public_key = PyJWK(key, key.get("alg", "RS256")).key
+        except Exception as e:
+            logger.error(f"Error loading Auth0 public key {kid}: {str(e)}")
+            continue
+        keys_by_kid[kid] = SigningKey(public_key, key.get("alg", "RS256"))
+    return keys_by_kid
+
+
+class _JWKSCache:
+    """
+    Auth0 public keys, refreshed when they expire
+
+    Concurrent requests that find the keys missing or expired wait for a
+    single fetch. Refreshes are conditional on the ETag, so unchanged keys
+    aren't downloaded and decoded again. Keys are loaded once per fetch
+    rather than once per token. A token signed with an unknown key forces a
+    refresh, at most once per JWKS_MIN_REFRESH_INTERVAL, so keys rotated by
+    Auth0 are picked up before the cached ones expire.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.jwks: Optional[Dict[str, Any]] = None
+        self.keys_by_kid: Dict[str, SigningKey] = {}
+        self.etag: Optional[str] = None
+        self.expires_at = 0.0
+        self.forced_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self.jwks is not None and time.monotonic() < self.expires_at
+
+    async def get(self) -> Dict[str, Any]:
+        """
+        Get the keys, fetching them if they are missing or expired
+
+        Returns:
+            Dictionary containing Auth0 public keys
+        """
+        if self._fresh():
+            return self.jwks
+
+        async with self._lock:
+            # Another request may have refreshed the keys while we waited
+            if not self._fresh():
+                await self._refresh()
+            return self.jwks
+
+    async def refresh_for_kid(self, kid: str) -> bool:
+        """
+        Fetch the keys again if a key ID isn't among the cached ones
+
+        Args:
+            kid: Key ID from a token header
+
+        Returns:
+            Whether the key ID is known afterwards
+        """
+        if kid in self.keys_by_kid:
+            return True
+
+        async with self._lock:
+            # Another request may have refreshed the keys while we waited,
+            # and made-up key IDs mustn't make us hammer the endpoint
+            now = time.monotonic()
+            if (
+                kid not in self.keys_by_kid
+                and now >= self.forced_at + JWKS_MIN_REFRESH_INTERVAL
+            ):
+                self.forced_at = now
+                await self._refresh()
+            return kid in self.keys_by_kid
+
+    def clear(self) -> None:
+        """Forget the cached keys"""
+        self.jwks = None
+        self.keys_by_kid = {}
+        self.etag = None
+        self.expires_at = 0.0
+        self.forced_at = float("-inf")
+
+    async def _refresh(self) -> None:
+        """Fetch the keys, keeping the current ones if they haven't changed"""
+        headers = {"If-None-Match": self.etag} if self.etag and self.jwks else {}
+        try:
+            response = await _get_http_client().get(self.url, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+                self.jwks = response.json()
+                self.keys_by_kid = _index_keys(self.jwks)
+                self.etag = response.headers.get("ETag")
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            logger.error(f"Error fetching Auth0 public keys: {str(e)}")
+            if self.jwks is None:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Unable to fetch authentication keys",
+                )
+
+            # Keep validating with the old keys and retry shortly
+            self.expires_at = time.monotonic() + JWKS_RETRY_AFTER
+            return
+
+        self.expires_at = time.monotonic() + _max_age(
+            response.headers.get("Cache-Control")
+        )
+
+
+# Cache for Auth0 public keys
+_jwks_cache = _JWKSCache(_jwks_url)
+
 
 async def get_auth0_public_keys() -> Dict[str, Any]:
     """
@@ -20,32 +208,29 @@ async def get_auth0_public_keys() -> Dict[str, Any]:
     Returns:
         Dictionary containing Auth0 public keys
     """
-    global _jwks_cache
+    return await _jwks_cache.get()
 
-    if _jwks_cache is not None:
-        return _jwks_cache
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(_jwks_url)
-            response.raise_for_status()
-            _jwks_cache = response.json()
-            return _jwks_cache
-    except (httpx.HTTPError, json.JSONDecodeError) as e:
-        logger.error(f"Error fetching Auth0 public keys: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Unable to fetch authentication keys",
-        )
+async def get_signing_keys() -> Dict[str, SigningKey]:
+    """
+    Get Auth0 public keys loaded for verification, indexed by key ID
 
+    Returns:
+        Dictionary mapping key IDs to signing keys
+    """
+    await get_auth0_public_keys()
+    return _jwks_cache.keys_by_kid
 
-def get_key_from_jwks(token: str, jwks: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+
+def get_key_from_jwks(
+    token: str, keys_by_kid: Dict[str, SigningKey]
+) -> Optional[SigningKey]:
     """
     Get the correct key from JWKS based on the token's kid
 
     Args:
         token: JWT token
-        jwks: JSON Web Key Set
+        keys_by_kid: Signing keys indexed by key ID
 
     Returns:
         The matching key or None if not found
@@ -59,13 +244,10 @@ def get_key_from_jwks(token: str, jwks: Dict[str, Any]) -> Optional[Dict[str, An
             logger.error("No key ID found in token")
             return None
 
-        # Find the key with the matching ID
-        for key in jwks.get("keys", []):
-            if key.get("kid") == kid:
-                return key
-
-        logger.error(f"No matching key found for kid {kid}")
-        return None
+        key = keys_by_kid.get(kid)
+        if key is None:
+            logger.error(f"No matching key found for kid {kid}")
+        return key
     except Exception as e:
         logger.error(f"Error extracting key ID from token: {str(e)}")
         return None
@@ -86,30 +268,32 @@ async def validate_and_decode_token(token: str) -> Dict[str, Any]:
     """
     try:
         # Get Auth0 public keys
-        jwks = await get_auth0_public_keys()
+        keys_by_kid = await get_signing_keys()
 
         # Get the key matching the token's kid
-        key = get_key_from_jwks(token, jwks)
+        key = get_key_from_jwks(token, keys_by_kid)
+        if not key:
+            # Auth0 may have rotated its keys since they were cached
+            kid = jwt.get_unverified_header(token).get("kid")
+            if kid and await _jwks_cache.refresh_for_kid(kid):
+                key = _jwks_cache.keys_by_kid[kid]
         if not key:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token signature",
             )
 
-        # Convert JWK to PEM format for verification
-        public_key = jwk.construct(key)
-
-        # Verify and decode the token
+        # Verify and decode the token with the key loaded at fetch time
         payload = jwt.decode(
             token,
-            public_key.to_pem().decode("utf-8"),
-            algorithms=[key.get("alg", "RS256")],
+            key=key.key,
+            algorithms=[key.alg],
             audience=AUTH0_API_AUDIENCE,
             issuer=f"https://{AUTH0_DOMAIN}/",
         )
 
         return payload
-    except JWTError as e:
+    except InvalidTokenError as e:
         logger.error(f"JWT validation error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
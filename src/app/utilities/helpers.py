@@ -1,11 +1,27 @@
 import os
+import asyncio
 import tempfile
 import logging
-from typing import List, Dict, Any, Optional
-import uuid
+from functools import lru_cache
+from typing import List
 
 logger = logging.getLogger(__name__)
 
+# Content larger than this is written in chunks (in bytes)
+LARGE_WRITE_SIZE = 8 * 1024 * 1024
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+# Number of IDs generated per os.urandom call
+ID_BATCH_SIZE = 64
+
+# IDs generated ahead of use
+_id_pool: List[str] = []
+
+# A forked worker must not hand out the same IDs as its parent. Windows has
+# no fork, so there is nothing to register there
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_id_pool.clear)
+
 
 def create_temp_file(content: bytes, prefix: str = "", suffix: str = "") -> str:
     """
@@ -22,17 +38,41 @@ def create_temp_file(content: bytes, prefix: str = "", suffix: str = "") -> str:
     try:
         fd, temp_path = tempfile.mkstemp(prefix=prefix, suffix=suffix)
         with os.fdopen(fd, "wb") as f:
-            f.write(content)
+            if len(content) <= LARGE_WRITE_SIZE:
+                f.write(content)
+            else:
+                view = memoryview(content)
+                for start in range(0, len(view), WRITE_CHUNK_SIZE):
+                    f.write(view[start : start + WRITE_CHUNK_SIZE])
         return temp_path
     except Exception as e:
         logger.error(f"Error creating temporary file: {str(e)}")
         raise e
 
 
+async def acreate_temp_file(content: bytes, prefix: str = "", suffix: str = "") -> str:
+    """
+    Create a temporary file with the given content without blocking the event loop
+
+    Args:
+        content: The content to write to the file
+        prefix: Prefix for the temporary file name
+        suffix: Suffix for the temporary file name (e.g., .pdf)
+
+    Returns:
+        The path to the temporary file
+    """
+    return await asyncio.to_thread(create_temp_file, content, prefix, suffix)
+
+
+@lru_cache(maxsize=4096)
 def ensure_user_dir(base_dir: str, user_id: str) -> str:
     """
     Ensure a user-specific directory exists
 
+    The result is cached, so the directory is only created on the first call
+    for each user.
+
     Args:
         base_dir: The base directory
         user_id: The user ID
@@ -45,11 +85,36 @@ def ensure_user_dir(base_dir: str, user_id: str) -> str:
     return user_dir
 
 
+def _generate_ids(count: int) -> List[str]:
+    """
+    Generate random (version 4) UUID strings from a single os.urandom call
+
+    Args:
+        count: Number of IDs to generate
+
+    Returns:
+        List of UUID strings
+    """
+    raw = bytearray(os.urandom(16 * count))
+    ids = []
+    for start in range(0, len(raw), 16):
+        # Set the version (4) and variant (RFC 4122) bits, as uuid.uuid4() does
+        raw[start + 6] = (raw[start + 6] & 0x0F) | 0x40
+        raw[start + 8] = (raw[start + 8] & 0x3F) | 0x80
+        h = raw[start : start + 16].hex()
+        ids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return ids
+
+
 def generate_id() -> str:
     """
     Generate a unique ID
 
     Returns:
-        A unique ID string
+        A unique ID string in UUID format
     """
-    return str(uuid.uuid4())
+    try:
+        return _id_pool.pop()
+    except IndexError:
+        _id_pool.extend(_generate_ids(ID_BATCH_SIZE))
+        return _id_pool.pop()
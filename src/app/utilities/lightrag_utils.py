@@ -4,22 +4,27 @@ Utilities for working with LightRAG instances
 
 import os
 import logging
-import asyncio
 import time
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, List
+
+import numpy as np
 
 from app.config import (
     VECTOR_DIMENSION,
     MAX_TOKEN_SIZE,
     CHUNK_SIZE,
-    GRAPH_TRAVERSAL_DEPTH,
     CACHE_ENABLED,
-    CACHE_SIZE,
+    SEMANTIC_CACHE_ENABLED,
 )
 from app.monitoring.lightrag_monitor import (
     monitor_lightrag_operation,
     get_lightrag_monitor,
 )
+from app.utilities.semantic_cache import (
+    embed_query,
+    get_query_cache,
+    invalidate_query_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -58,12 +63,26 @@ except ImportError:
         async def initialize_storages(self):
             logger.info("Mock: Initialized storages")
 
-        def insert(self, text):
-            logger.info(f"Mock: Inserted text of length {len(text)}")
+        # Same signatures as LightRAG's, so unsupported arguments fail here too
+        def insert(
+            self,
+            input,
+            split_by_character=None,
+            split_by_character_only=False,
+            ids=None,
+            file_paths=None,
+        ):
+            logger.info(f"Mock: Inserted text of length {len(input)}")
 
-        async def ainsert(self, text, **kwargs):
-            # Accept any keyword arguments (chunk_size, chunk_overlap, etc.)
-            logger.info(f"Mock: Asynchronously inserted text of length {len(text)}")
+        async def ainsert(
+            self,
+            input,
+            split_by_character=None,
+            split_by_character_only=False,
+            ids=None,
+            file_paths=None,
+        ):
+            logger.info(f"Mock: Asynchronously inserted text of length {len(input)}")
 
         def search(self, query_text, param=None):
             logger.info(f"Mock: Searched with text: {query_text}")
@@ -113,11 +132,10 @@ except ImportError:
         return "Mock GPT-4o mini response"
 
     def openai_embed(texts):
-        # Return an array of the correct dimension for each text
-        return [
-            [0.0] * VECTOR_DIMENSION
-            for _ in range(len(texts) if isinstance(texts, list) else 1)
-        ]
+        # Return a zero vector of the correct dimension for each text, as one
+        # contiguous array like the real function does
+        count = len(texts) if isinstance(texts, list) else 1
+        return np.zeros((count, VECTOR_DIMENSION), dtype=np.float32)
 
 
 async def initialize_lightrag_instance(
@@ -160,6 +178,7 @@ async def initialize_lightrag_instance(
         working_dir=working_dir,
         llm_model_func=llm_model_func,
         embedding_func=embedding_func,
+        chunk_token_size=CHUNK_SIZE,
         enable_llm_cache_for_entity_extract=True,
         kv_storage="PGKVStorage",
         doc_status_storage="PGDocStatusStorage",
@@ -206,9 +225,7 @@ async def ingest_document(
         if not file_path:
             file_path = documentId
 
-        # Apply configuration parameters
-        chunk_size = CHUNK_SIZE
-
+        # Chunking is configured on the LightRAG instance (chunk_token_size)
         if hasattr(rag, "ainsert"):
             logger.info("Using async insert")
             # Use async insert if available
@@ -216,7 +233,6 @@ async def ingest_document(
                 content,
                 ids=[str(documentId)],
                 file_paths=[str(file_path)],
-                chunk_size=chunk_size,
             )
         else:
             logger.info("Using sync insert")
@@ -226,9 +242,9 @@ async def ingest_document(
                 content,
                 ids=[str(documentId)],
                 file_paths=[str(file_path)],
-                chunk_size=chunk_size,
             )
 
+        invalidate_query_cache(rag)
         logger.info(f"Successfully ingested document of length {len(content)}")
     except Exception as e:
         logger.error(f"Error ingesting document: {e}")
@@ -238,6 +254,58 @@ async def ingest_document(
         raise
 
 
+@monitor_lightrag_operation("insert")
+async def ingest_documents(
+    rag: LightRAG,
+    contents: List[str],
+    documentIds: List[str],
+    file_paths: Optional[List[str]] = None,
+) -> None:
+    """
+    Ingest a batch of documents into LightRAG with a single insert call
+
+    Args:
+        rag: The LightRAG instance
+        contents: The document contents
+        documentIds: The document IDs, one per content
+        file_paths: Optional file paths, one per content
+    """
+    try:
+        if not documentIds or len(documentIds) != len(contents):
+            raise ValueError("One documentId is required per document")
+
+        if not file_paths:
+            file_paths = documentIds
+
+        # Chunking is configured on the LightRAG instance (chunk_token_size)
+        if hasattr(rag, "ainsert"):
+            logger.info(f"Using async insert for {len(contents)} documents")
+            # Use async insert if available
+            await rag.ainsert(
+                contents,
+                ids=[str(doc_id) for doc_id in documentIds],
+                file_paths=[str(path) for path in file_paths],
+            )
+        else:
+            logger.info(f"Using sync insert for {len(contents)} documents")
+            # Fall back to sync insert
+            # Note: In a real async context, this blocks the event loop
+            rag.insert(
+                contents,
+                ids=[str(doc_id) for doc_id in documentIds],
+                file_paths=[str(path) for path in file_paths],
+            )
+
+        invalidate_query_cache(rag)
+        logger.info(f"Successfully ingested batch of {len(contents)} documents")
+    except Exception as e:
+        logger.error(f"Error ingesting documents: {e}")
+        # Record error in monitor
+        monitor = get_lightrag_monitor()
+        monitor.record_error()
+        raise
+
+
 @monitor_lightrag_operation("search")
 async def search_lightrag(
     rag: LightRAG, query: str, mode: str = "hybrid", max_chunks: int = 5
@@ -262,6 +330,18 @@ async def search_lightrag(
             top_k=max_chunks,
         )
 
+        # Reuse the results of the same or a reworded recent search
+        cache = embedding = None
+        if CACHE_ENABLED:
+            cache = get_query_cache(rag, ("search", mode, max_chunks))
+            results = cache.get(query)
+            if results is None and SEMANTIC_CACHE_ENABLED:
+                embedding = await embed_query(rag, query)
+                results = cache.get(query, embedding)
+            if results is not None:
+                logger.info(f"Search served from cache: {query}")
+                return results
+
         if hasattr(rag, "asearch"):
             # Use async search if available
             results = await rag.asearch(query, param=param)
@@ -270,6 +350,9 @@ async def search_lightrag(
             # Note: In a real async context, this blocks the event loop
             results = rag.search(query, param=param)
 
+        if cache is not None and results:
+            cache.put(query, results, embedding)
+
         logger.info(f"Search successful: {query}, found {len(results)} results")
         return results
     except Exception as e:
@@ -296,7 +379,8 @@ async def ingest_text(
         content: The text content to ingest
         textId: The text ID
         title: Optional title for the text
-        metadata: Optional additional metadata
+        metadata: Optional additional metadata (kept by the caller; LightRAG
+            has no per-document metadata)
 
     Returns:
         Dict with status information about the ingestion
@@ -308,14 +392,7 @@ async def ingest_text(
         if not textId:
             raise ValueError("textId is required")
 
-        # Apply configuration parameters
-        chunk_size = CHUNK_SIZE
-
-        # Prepare metadata
-        meta = metadata or {}
-        if title:
-            meta["title"] = title
-
+        # Chunking is configured on the LightRAG instance (chunk_token_size)
         # Track start time for performance monitoring
         start_time = time.time()
 
@@ -326,8 +403,6 @@ async def ingest_text(
                 content,
                 ids=[str(textId)],
                 file_paths=[f"text_{textId}"],  # Virtual path for text
-                chunk_size=chunk_size,
-                metadata=meta,
             )
         else:
             logger.info("Using sync insert for text")
@@ -337,10 +412,10 @@ async def ingest_text(
                 content,
                 ids=[str(textId)],
                 file_paths=[f"text_{textId}"],  # Virtual path for text
-                chunk_size=chunk_size,
-                metadata=meta,
             )
 
+        invalidate_query_cache(rag)
+
         # Calculate processing time
         processing_time = time.time() - start_time
 
@@ -387,6 +462,18 @@ async def query_lightrag(
             top_k=max_chunks,
         )
 
+        # Reuse the response to the same or a reworded recent query
+        cache = embedding = None
+        if CACHE_ENABLED:
+            cache = get_query_cache(rag, ("query", mode, max_chunks))
+            response = cache.get(query)
+            if response is None and SEMANTIC_CACHE_ENABLED:
+                embedding = await embed_query(rag, query)
+                response = cache.get(query, embedding)
+            if response is not None:
+                logger.info(f"Query served from cache: {query}")
+                return response
+
         if hasattr(rag, "aquery"):
             # Use async query if available
             response = await rag.aquery(query, param=param)
@@ -395,6 +482,9 @@ async def query_lightrag(
             # Note: In a real async context, this blocks the event loop
             response = rag.query(query, param=param)
 
+        if cache is not None and response:
+            cache.put(query, response, embedding)
+
         logger.info(f"Query successful: {query}")
         return response
     except Exception as e:
@@ -0,0 +1,259 @@
+"""
+Semantic cache of LightRAG query and search results
+
+A query is answered from the cache when a recent query with the same
+parameters had the same normalized text. Optionally, a reworded query is also
+answered when its embedding is nearly identical and it names the same
+numbers and proper nouns, which skips the whole RAG pipeline for repeated or
+reworded questions.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of queries remembered per user and query parameters
+QUERY_CACHE_SIZE = 128
+
+# Cosine similarity above which two queries are considered the same
+QUERY_CACHE_THRESHOLD = 0.99
+
+# Words whose change alters a query's meaning however similar the embeddings
+# are: anything containing a digit, and capitalized words after the first
+_LITERAL_RE = re.compile(r"\w*\d\w*|(?<!^)\b[A-Z]\w*")
+
+# Weights of the eviction score: time since last use, unlikelihood of reuse,
+# and result size
+EVICTION_RECENCY_WEIGHT = 0.3
+EVICTION_REUSE_WEIGHT = 0.5
+EVICTION_SIZE_WEIGHT = 0.2
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold a query and collapse its whitespace"""
+    return " ".join(query.casefold().split())
+
+
+def query_literals(query: str) -> FrozenSet[str]:
+    """Get the numbers and proper nouns a query names"""
+    return frozenset(m.casefold() for m in _LITERAL_RE.findall(query.strip()))
+
+
+class SemanticQueryCache:
+    """
+    Results of recent queries, looked up by text or embedding similarity
+
+    Query embeddings are quantized to int8 with a per-row scale and kept as
+    rows of one preallocated matrix, a quarter of the memory of float32, so a
+    lookup is a single matrix-vector product over the filled rows. Usage
+    statistics are kept in parallel arrays.
+
+    When full, the entry evicted is the one scoring highest on staleness, low
+    reuse rate and result size, so small, frequently reused answers stay. The
+    new entry takes over the evicted row.
+    """
+
+    def __init__(
+        self, capacity: int = QUERY_CACHE_SIZE, threshold: float = QUERY_CACHE_THRESHOLD
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.count = 0
+        self.results: List[Any] = [None] * capacity
+
+        # Normalized text and literals of each row, and rows by text
+        self.texts: List[Optional[str]] = [None] * capacity
+        self.literals: List[FrozenSet[str]] = [frozenset()] * capacity
+        self.rows: Dict[str, int] = {}
+        self.created_at = np.zeros(capacity)
+        self.last_access = np.zeros(capacity)
+        self.hits = np.zeros(capacity)
+        self.sizes = np.zeros(capacity)
+
+        # Factor converting each int8 row back to its float values
+        self.scales = np.zeros(capacity, dtype=np.float32)
+
+        # Allocated on the first put, once the embedding dimension is known
+        self.embeddings: Optional[np.ndarray] = None
+
+    def get(
+        self, query: str, embedding: Optional[np.ndarray] = None
+    ) -> Optional[Any]:
+        """
+        Find the result of the same or, given an embedding, a similar query
+
+        Args:
+            query: The query text
+            embedding: Normalized query embedding, for similarity matching
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        row = self.rows.get(normalize_query(query))
+        if row is None and embedding is not None:
+            row = self._similar_row(query, embedding)
+        if row is None:
+            return None
+
+        self.last_access[row] = time.monotonic()
+        self.hits[row] += 1
+        return self.results[row]
+
+    def _similar_row(self, query: str, embedding: np.ndarray) -> Optional[int]:
+        """Get the row of a cached query similar to the given one"""
+        if not self.count or self.embeddings is None:
+            return None
+
+        # Similarity to every cached query in one matrix-vector product.
+        # NumPy has no fast int8 product, so rows are widened to float32 for it
+        count = self.count
+        similarities = (
+            self.embeddings[:count].astype(np.float32) @ embedding
+        ) * self.scales[:count]
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        # Embeddings barely move when only a number or name changes
+        if self.literals[best] != query_literals(query):
+            return None
+        return best
+
+    def put(
+        self, query: str, result: Any, embedding: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Cache the result of a query
+
+        Args:
+            query: The query text
+            result: Query result
+            embedding: Normalized query embedding, for similarity matching
+        """
+        text = normalize_query(query)
+        row = self.rows.get(text)
+        if row is None:
+            if self.count < self.capacity:
+                row = self.count
+                self.count += 1
+            else:
+                row = self._eviction_victim()
+                self.rows.pop(self.texts[row], None)
+            self.rows[text] = row
+
+        if embedding is not None:
+            if self.embeddings is None:
+                self.embeddings = np.zeros(
+                    (self.capacity, embedding.shape[0]), dtype=np.int8
+                )
+
+            # Scale the largest component to 127; for unit vectors this keeps
+            # cosine similarity within about 1%
+            peak = float(np.abs(embedding).max()) or 1.0
+            self.embeddings[row] = np.round(embedding * (127.0 / peak))
+            self.scales[row] = peak / 127.0
+        elif self.embeddings is not None:
+            # Never matches by similarity
+            self.scales[row] = 0.0
+
+        now = time.monotonic()
+        self.results[row] = result
+        self.texts[row] = text
+        self.literals[row] = query_literals(query)
+        self.created_at[row] = now
+        self.last_access[row] = now
+        self.hits[row] = 0
+        self.sizes[row] = len(str(result))
+
+    def clear(self) -> None:
+        """Drop every cached result"""
+        self.count = 0
+        self.results = [None] * self.capacity
+        self.texts = [None] * self.capacity
+        self.rows.clear()
+
+    def _eviction_victim(self) -> int:
+        """Get the row of the entry to evict"""
+        now = time.monotonic()
+        idle = now - self.last_access
+        reuse = self.hits / (now - self.created_at + 1.0)
+        sizes = self.sizes
+
+        scores = (
+            EVICTION_RECENCY_WEIGHT * idle / (idle.max() or 1.0)
+            + EVICTION_REUSE_WEIGHT * (1.0 - reuse / (reuse.max() or 1.0))
+            + EVICTION_SIZE_WEIGHT * sizes / (sizes.max() or 1.0)
+        )
+        return int(np.argmax(scores))
+
+
+def _query_caches(rag) -> Dict[Hashable, SemanticQueryCache]:
+    """
+    Get the query caches attached to a LightRAG instance, creating them on first use
+
+    Keeping the caches on the instance ties them to one user's data and drops
+    them when the RAG manager evicts the instance.
+    """
+    caches = vars(rag).get("_semantic_query_caches")
+    if caches is None:
+        caches = {}
+        rag._semantic_query_caches = caches
+    return caches
+
+
+def get_query_cache(rag, key: Hashable) -> SemanticQueryCache:
+    """
+    Get a LightRAG instance's cache for one kind of query
+
+    Args:
+        rag: The LightRAG instance
+        key: Query parameters that must match for a cached result to be reused
+
+    Returns:
+        The semantic query cache
+    """
+    caches = _query_caches(rag)
+    cache = caches.get(key)
+    if cache is None:
+        cache = caches[key] = SemanticQueryCache()
+    return cache
+
+
+def invalidate_query_cache(rag) -> None:
+    """
+    Drop cached query results for a LightRAG instance after its data changes
+
+    Args:
+        rag: The LightRAG instance
+    """
+    vars(rag).pop("_semantic_query_caches", None)
+
+
+async def embed_query(rag, query: str) -> Optional[np.ndarray]:
+    """
+    Embed a query with the instance's embedding function for cache lookups
+
+    Args:
+        rag: The LightRAG instance
+        query: The query text
+
+    Returns:
+        The L2-normalized embedding, or None if the query can't be embedded
+        (e.g. with the mock embedding function, which returns zero vectors)
+    """
+    try:
+        embeddings = await rag.embedding_func([query])
+        embedding = np.asarray(embeddings, dtype=np.float32).reshape(-1)
+    except Exception as e:
+        logger.debug(f"Skipping query cache, embedding failed: {e}")
+        return None
+
+    norm = float(np.linalg.norm(embedding))
+    if not np.isfinite(norm) or norm == 0.0:
+        return None
+    return embedding / norm
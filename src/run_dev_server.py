@@ -1,5 +1,6 @@
 import uvicorn
 import argparse
+import importlib.util
 import logging
 import os
 from dotenv import load_dotenv
@@ -14,6 +15,22 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Auth0 configuration, read once after the .env file is loaded
+AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN", "")
+AUTH0_API_AUDIENCE = os.getenv("AUTH0_API_AUDIENCE", "")
+
+
+def _implementation(module: str) -> str:
+    """
+    Choose a uvicorn implementation, falling back to uvicorn's default if the
+    module providing it isn't installed (e.g. uvloop on Windows)
+    """
+    if importlib.util.find_spec(module) is not None:
+        return module
+
+    logger.warning(f"{module} is not installed, using uvicorn's default")
+    return "auto"
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -33,25 +50,52 @@ def main():
     parser.add_argument(
         "--reload", action="store_true", help="Enable auto-reload on code changes"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes, currently only 1 is supported "
+        "(default: WEB_CONCURRENCY or 1)",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Disable the access log and log only warnings, e.g. for load testing",
+    )
 
     args = parser.parse_args()
 
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1:
+        # Document metadata, RAG instances and ingestion queues are kept per
+        # process, so workers would overwrite each other's metadata files
+        parser.error(
+            "--workers must be 1 until document metadata is safe to share "
+            "between processes"
+        )
+
     logger.info(f"Starting development server at http://{args.host}:{args.port}")
     logger.info(f"Auto-reload: {'Enabled' if args.reload else 'Disabled'}")
+    logger.info(f"Workers: {args.workers}")
+    logger.info(f"Access log: {'Disabled' if args.quiet else 'Enabled'}")
 
     # Print Auth0 configuration (without sensitive values)
-    auth0_domain = os.getenv("AUTH0_DOMAIN", "")
-    auth0_audience = os.getenv("AUTH0_API_AUDIENCE", "")
-
-    logger.info(f"Auth0 Domain: {auth0_domain}")
-    logger.info(f"Auth0 API Audience: {auth0_audience}")
+    logger.info(f"Auth0 Domain: {AUTH0_DOMAIN}")
+    logger.info(f"Auth0 API Audience: {AUTH0_API_AUDIENCE}")
 
-    # Start the server
+    # Start the server on the libuv event loop and the C HTTP parser
     uvicorn.run(
         "app.main:app",
         host=args.host,
         port=args.port,
         reload=args.reload,
+        workers=args.workers,
+        loop=_implementation("uvloop"),
+        http=_implementation("httptools"),
+        # Formatting a log record per request costs event loop time under load
+        access_log=not args.quiet,
+        log_level="warning" if args.quiet else "info",
     )
 
 
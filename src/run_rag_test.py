@@ -22,6 +22,20 @@ async def main():
     print("Test completed successfully!")
 
 
+def _loop_factory():
+    """Create a uvloop event loop, or a standard one where uvloop isn't available"""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.new_event_loop()
+    return uvloop.new_event_loop()
+
+
 if __name__ == "__main__":
     # Run the async main function
-    asyncio.run(main())
+    with asyncio.Runner(loop_factory=_loop_factory) as runner:
+        # Coroutines that finish without suspending skip the scheduler
+        # (eager tasks are available from Python 3.12)
+        if hasattr(asyncio, "eager_task_factory"):
+            runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+        runner.run(main())
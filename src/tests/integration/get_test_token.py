@@ -9,8 +9,11 @@ using client credentials grant for integration tests.
 import os
 import sys
 import json
+import time
+import base64
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import logging
 
@@ -29,6 +32,21 @@ DEFAULT_AUTH0_CLIENT_ID = os.environ.get("AUTH0_CLIENT_ID", "")
 DEFAULT_AUTH0_CLIENT_SECRET = os.environ.get("AUTH0_CLIENT_SECRET", "")
 DEFAULT_AUTH0_AUDIENCE = os.environ.get("AUTH0_API_AUDIENCE", "https://api.embediq.dev")
 
+# Session shared by token requests, so repeated calls (e.g. from test fixtures)
+# reuse the TLS connection to Auth0
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# Where fetched tokens are kept until they expire
+TOKEN_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "embediq",
+    "auth_token.json",
+)
+
+# Cached tokens this close to expiry are refreshed instead (in seconds)
+TOKEN_EXPIRY_MARGIN = 60
+
 
 def get_auth_token(domain, client_id, client_secret, audience):
     """Get an Auth0 access token using client credentials grant"""
@@ -40,11 +58,50 @@ def get_auth_token(domain, client_id, client_secret, audience):
         "grant_type": "client_credentials",
     }
 
-    response = requests.post(url, json=payload)
+    response = _SESSION.post(url, json=payload, timeout=10)
     response.raise_for_status()
     return response.json()["access_token"]
 
 
+def get_token_expiry(token):
+    """Read the exp claim of a JWT without verifying it"""
+    payload = token.split(".")[1]
+    payload += "=" * (-len(payload) % 4)
+    return json.loads(base64.urlsafe_b64decode(payload))["exp"]
+
+
+def get_cached_auth_token(domain, client_id, client_secret, audience):
+    """Get an Auth0 access token, reusing the cached one until it expires"""
+    cache_key = f"{domain}|{client_id}|{audience}"
+
+    try:
+        with open(TOKEN_CACHE_PATH) as f:
+            cached = json.load(f)
+        if (
+            cached["key"] == cache_key
+            and cached["exp"] - time.time() > TOKEN_EXPIRY_MARGIN
+        ):
+            logger.info("Using cached token")
+            return cached["access_token"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    token = get_auth_token(domain, client_id, client_secret, audience)
+
+    try:
+        entry = {"key": cache_key, "access_token": token, "exp": get_token_expiry(token)}
+        os.makedirs(os.path.dirname(TOKEN_CACHE_PATH), exist_ok=True)
+
+        # The token is a credential, so only the owner may read the cache
+        fd = os.open(TOKEN_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+    except (OSError, ValueError, KeyError, IndexError) as e:
+        logger.warning(f"Could not cache token: {e}")
+
+    return token
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Get a test authentication token for integration tests"
@@ -61,6 +118,11 @@ if __name__ == "__main__":
     parser.add_argument(
         "--audience", default=DEFAULT_AUTH0_AUDIENCE, help="API audience"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always request a new token instead of reusing a cached one",
+    )
 
     args = parser.parse_args()
 
@@ -73,7 +135,8 @@ if __name__ == "__main__":
     # Get token
     try:
         logger.info(f"Getting token for {args.domain} with audience {args.audience}")
-        token = get_auth_token(
+        fetch_token = get_auth_token if args.no_cache else get_cached_auth_token
+        token = fetch_token(
             args.domain, args.client_id, args.client_secret, args.audience
         )
 
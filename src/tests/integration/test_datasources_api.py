@@ -2,131 +2,207 @@
 Integration tests for the Data Source Configuration API.
 """
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
-import json
+import pytest_asyncio
+import orjson
 import logging
-import os
-from unittest.mock import patch, MagicMock, AsyncMock
+from unittest.mock import patch, MagicMock
 import asyncio
-from uuid import UUID, uuid4
+from uuid import UUID
 from datetime import datetime, timezone
-from fastapi import HTTPException
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 
-from app.main import app
 from app.models.datasources import (
-    DataSourceConfig,
     DatabaseDataSource,
-    FileDataSource,
-    APIDataSource,
-    S3DataSource,
     ValidationResult,
-    DataSourceResponse,
-    DataSourceList,
     DataSourceTypeInfo,
-    DataSourceTypeList,
 )
-from app.services.datasource_service import ConfigurationStorageService
-from app.services.datasource_validation_service import DataSourceValidationService
-from app.services.datasource_registry import datasource_registry
+from app.routes.datasources import datasources_router
+from app.middleware.auth import validate_token
 
 logger = logging.getLogger(__name__)
 
-# Test client
-client = TestClient(app)
-
 # Mock token for testing
 TEST_TOKEN = "test_token"
+AUTH_HEADERS = {"Authorization": f"Bearer {TEST_TOKEN}"}
 TEST_USER_ID = "test_user_123"
 
+# Data source ID used in request paths; the storage service is mocked, so any
+# valid UUID will do
+TEST_CONFIG_ID = "00000000-0000-4000-8000-000000000000"
+TEST_CONFIG_UUID = UUID(TEST_CONFIG_ID)
+
+# Timestamp of the mocked stored configuration
+_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Keys every response of each kind must have
+_DATASOURCE_KEYS = frozenset(
+    {"id", "name", "type", "description", "config", "created_at", "updated_at"}
+)
+_DATASOURCE_LIST_KEYS = frozenset({"datasources", "total"})
+_VALIDATION_KEYS = frozenset({"success", "message", "details", "warnings"})
+_TYPE_INFO_KEYS = frozenset({"type", "description", "parameters"})
+
+# Request body for creating a data source
+_BASE_CONFIG_DATA = {
+    "name": "Test Database",
+    "type": "postgres",
+    "description": "Test database configuration",
+    "host": "localhost",
+    "port": 5432,
+    "database": "testdb",
+    "username": "testuser",
+    "password": "testpassword",
+}
+
+# The same body serialized once, for tests that send it unchanged
+_BASE_CONFIG_JSON = orjson.dumps(_BASE_CONFIG_DATA)
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_JSON_AUTH_HEADERS = {**AUTH_HEADERS, **_JSON_HEADERS}
+
+# Stored configuration returned by every mocked storage method. Built once,
+# from typed values so the model doesn't have to parse strings; the routes
+# only read it
+_TEST_DATASOURCE = DatabaseDataSource(
+    **_BASE_CONFIG_DATA,
+    id=TEST_CONFIG_UUID,
+    created_at=_NOW,
+    updated_at=_NOW,
+)
+
+# Result returned by the mocked validation service
+_VALIDATION_RESULT = ValidationResult(
+    success=True,
+    message="Validation successful",
+    details={"database_type": "postgres"},
+    warnings=[],
+)
+
+# Data source types returned by the mocked registry, built once at import
+_POSTGRES_TYPE_INFO = DataSourceTypeInfo(
+    type="postgres",
+    description="PostgreSQL database",
+    parameters=[
+        {
+            "name": "host",
+            "type": "string",
+            "required": False,
+            "description": "Database host",
+            "default": "localhost",
+        },
+        {
+            "name": "port",
+            "type": "integer",
+            "required": False,
+            "description": "Database port",
+            "default": 5432,
+        },
+        {
+            "name": "database",
+            "type": "string",
+            "required": True,
+            "description": "Database name",
+        },
+    ],
+)
+
+_MYSQL_TYPE_INFO = DataSourceTypeInfo(
+    type="mysql",
+    description="MySQL database",
+    parameters=[
+        {
+            "name": "host",
+            "type": "string",
+            "required": False,
+            "description": "Database host",
+            "default": "localhost",
+        },
+        {
+            "name": "port",
+            "type": "integer",
+            "required": False,
+            "description": "Database port",
+            "default": 3306,
+        },
+        {
+            "name": "database",
+            "type": "string",
+            "required": True,
+            "description": "Database name",
+        },
+    ],
+)
+
+
+def _returning(value):
+    """
+    Create an async stand-in for a service method whose calls aren't inspected
+
+    Cheaper than AsyncMock, which records every call.
+    """
+
+    async def method(*args, **kwargs):
+        return value
+
+    return method
+
+
+# App with only the datasources routes, so the tests don't load the whole API
+@pytest.fixture(scope="session")
+def datasources_app():
+    """Create an app that mounts the datasources router as app.main does"""
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(datasources_router, prefix="/api/v1/datasources")
+    return app
+
+
+# Test client, calling the app in the test's event loop without a thread hop
+@pytest_asyncio.fixture
+async def aclient(datasources_app):
+    """Create an async client that sends requests straight to the app"""
+    transport = httpx.ASGITransport(app=datasources_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
 
 # Mock the validate_token dependency
 @pytest.fixture
-def mock_validate_token():
-    """Mock the validate_token dependency to return a test user ID"""
-    with patch("app.middleware.auth.validate_and_decode_token") as mock_validate:
-        mock_validate.return_value = {"sub": TEST_USER_ID}
-        yield
+def mock_validate_token(datasources_app):
+    """Override the validate_token dependency to return a test user ID"""
+    datasources_app.dependency_overrides[validate_token] = lambda: TEST_USER_ID
+    yield
+    datasources_app.dependency_overrides.pop(validate_token, None)
 
 
 # Mock the ConfigurationStorageService
 @pytest.fixture
 def mock_storage_service():
     """Mock the ConfigurationStorageService methods"""
-    # Create a test configuration
-    test_config = {
-        "id": str(uuid4()),
-        "name": "Test Database",
-        "type": "postgres",
-        "description": "Test database configuration",
-        "host": "localhost",
-        "port": 5432,
-        "database": "testdb",
-        "username": "testuser",
-        "password": "testpassword",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat(),
-    }
-
-    # Create a database data source object
-    test_datasource = DatabaseDataSource(**test_config)
-
-    # Patch the save_config method
-    with patch(
-        "app.routes.datasources.ConfigurationStorageService.save_config",
-        new_callable=AsyncMock,
-        return_value=test_datasource,
+    with patch.multiple(
+        "app.routes.datasources.ConfigurationStorageService",
+        save_config=_returning(_TEST_DATASOURCE),
+        get_config=_returning(_TEST_DATASOURCE),
+        list_configs=_returning([_TEST_DATASOURCE]),
+        update_config=_returning(_TEST_DATASOURCE),
+        delete_config=_returning(True),
+        get_user_datasources_dir=MagicMock(
+            return_value="/tmp/test_user_123/datasources"
+        ),
     ):
-        # Patch the get_config method
-        with patch(
-            "app.routes.datasources.ConfigurationStorageService.get_config",
-            new_callable=AsyncMock,
-            return_value=test_datasource,
-        ):
-            # Patch the list_configs method
-            with patch(
-                "app.routes.datasources.ConfigurationStorageService.list_configs",
-                new_callable=AsyncMock,
-                return_value=[test_datasource],
-            ):
-                # Patch the update_config method
-                with patch(
-                    "app.routes.datasources.ConfigurationStorageService.update_config",
-                    new_callable=AsyncMock,
-                    return_value=test_datasource,
-                ):
-                    # Patch the delete_config method
-                    with patch(
-                        "app.routes.datasources.ConfigurationStorageService.delete_config",
-                        new_callable=AsyncMock,
-                        return_value=True,
-                    ):
-                        # Patch the get_user_datasources_dir method
-                        with patch(
-                            "app.routes.datasources.ConfigurationStorageService.get_user_datasources_dir",
-                            return_value="/tmp/test_user_123/datasources",
-                        ):
-                            yield
+        yield
 
 
 # Mock the DataSourceValidationService
 @pytest.fixture
 def mock_validation_service():
     """Mock the DataSourceValidationService methods"""
-    # Create a validation result
-    validation_result = ValidationResult(
-        success=True,
-        message="Validation successful",
-        details={"database_type": "postgres"},
-        warnings=[],
-    )
-
     # Patch the validate_config method
     with patch(
         "app.routes.datasources.DataSourceValidationService.validate_config",
-        new_callable=AsyncMock,
-        return_value=validation_result,
+        new=_returning(_VALIDATION_RESULT),
     ):
         yield
 
@@ -138,115 +214,27 @@ def mock_registry():
     with patch("app.routes.datasources.datasource_registry") as mock_reg:
         # Mock the list_type_info method
         mock_reg.list_type_info = MagicMock(
-            return_value=[
-                DataSourceTypeInfo(
-                    type="postgres",
-                    description="PostgreSQL database",
-                    parameters=[
-                        {
-                            "name": "host",
-                            "type": "string",
-                            "required": False,
-                            "description": "Database host",
-                            "default": "localhost",
-                        },
-                        {
-                            "name": "port",
-                            "type": "integer",
-                            "required": False,
-                            "description": "Database port",
-                            "default": 5432,
-                        },
-                        {
-                            "name": "database",
-                            "type": "string",
-                            "required": True,
-                            "description": "Database name",
-                        },
-                    ],
-                ),
-                DataSourceTypeInfo(
-                    type="mysql",
-                    description="MySQL database",
-                    parameters=[
-                        {
-                            "name": "host",
-                            "type": "string",
-                            "required": False,
-                            "description": "Database host",
-                            "default": "localhost",
-                        },
-                        {
-                            "name": "port",
-                            "type": "integer",
-                            "required": False,
-                            "description": "Database port",
-                            "default": 3306,
-                        },
-                        {
-                            "name": "database",
-                            "type": "string",
-                            "required": True,
-                            "description": "Database name",
-                        },
-                    ],
-                ),
-            ]
+            return_value=[_POSTGRES_TYPE_INFO, _MYSQL_TYPE_INFO]
         )
 
         # Mock the get_type_info method
-        mock_reg.get_type_info = MagicMock(
-            return_value=DataSourceTypeInfo(
-                type="postgres",
-                description="PostgreSQL database",
-                parameters=[
-                    {
-                        "name": "host",
-                        "type": "string",
-                        "required": False,
-                        "description": "Database host",
-                        "default": "localhost",
-                    },
-                    {
-                        "name": "port",
-                        "type": "integer",
-                        "required": False,
-                        "description": "Database port",
-                        "default": 5432,
-                    },
-                    {
-                        "name": "database",
-                        "type": "string",
-                        "required": True,
-                        "description": "Database name",
-                    },
-                ],
-            )
-        )
+        mock_reg.get_type_info = MagicMock(return_value=_POSTGRES_TYPE_INFO)
 
         yield mock_reg
 
 
 # Test creating a data source configuration
-def test_create_datasource(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_create_datasource(aclient, mock_validate_token, mock_storage_service):
     """Test creating a data source configuration"""
     # Prepare request data
-    config_data = {
-        "name": "Test Database",
-        "type": "postgres",
-        "description": "Test database configuration",
-        "host": "localhost",
-        "port": 5432,
-        "database": "testdb",
-        "username": "testuser",
-        "password": "testpassword",
-    }
+    config_data = _BASE_CONFIG_DATA
 
     # Send POST request to create a data source
-    response = client.post(
+    response = await aclient.post(
         "/api/v1/datasources",
-        json=config_data,
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        content=_BASE_CONFIG_JSON,
+        headers=_JSON_AUTH_HEADERS,
     )
 
     # Check response
@@ -255,75 +243,69 @@ def test_create_datasource(mock_validate_token, mock_storage_service):
     assert data["name"] == config_data["name"]
     assert data["type"] == config_data["type"]
     assert data["description"] == config_data["description"]
-    assert "id" in data
-    assert "created_at" in data
-    assert "updated_at" in data
+    assert _DATASOURCE_KEYS <= data.keys()
 
 
 # Test listing data source configurations
-def test_list_datasources(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_list_datasources(aclient, mock_validate_token, mock_storage_service):
     """Test listing data source configurations"""
     # Send GET request to list data sources
-    response = client.get(
+    response = await aclient.get(
         "/api/v1/datasources",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
     assert response.status_code == 200
     data = response.json()
-    assert "datasources" in data
-    assert "total" in data
+    assert _DATASOURCE_LIST_KEYS <= data.keys()
     assert data["total"] == 1
     assert len(data["datasources"]) == 1
 
 
 # Test getting a specific data source configuration
-def test_get_datasource(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_get_datasource(aclient, mock_validate_token, mock_storage_service):
     """Test getting a specific data source configuration"""
     # Get a test config ID
-    test_config_id = str(uuid4())
+    test_config_id = TEST_CONFIG_ID
 
     # Send GET request to get a specific data source
-    response = client.get(
+    response = await aclient.get(
         f"/api/v1/datasources/{test_config_id}",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
     assert response.status_code == 200
     data = response.json()
-    assert "id" in data
-    assert "name" in data
-    assert "type" in data
-    assert "description" in data
-    assert "config" in data
+    assert _DATASOURCE_KEYS <= data.keys()
 
 
 # Test updating a data source configuration
-def test_update_datasource(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_update_datasource(aclient, mock_validate_token, mock_storage_service):
     """Test updating a data source configuration"""
     # Get a test config ID
-    test_config_id = str(uuid4())
+    test_config_id = TEST_CONFIG_ID
 
     # Prepare request data
     config_data = {
+        **_BASE_CONFIG_DATA,
         "id": test_config_id,
         "name": "Updated Database",
-        "type": "postgres",
         "description": "Updated database configuration",
-        "host": "localhost",
-        "port": 5432,
         "database": "updateddb",
         "username": "updateduser",
         "password": "updatedpassword",
     }
 
     # Send PUT request to update a data source
-    response = client.put(
+    response = await aclient.put(
         f"/api/v1/datasources/{test_config_id}",
         json=config_data,
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
@@ -331,20 +313,20 @@ def test_update_datasource(mock_validate_token, mock_storage_service):
     data = response.json()
     # The mock returns "Test Database" instead of "Updated Database"
     # This is expected because we're using a fixed mock response
-    assert "name" in data
-    assert "description" in data
+    assert _DATASOURCE_KEYS <= data.keys()
 
 
 # Test deleting a data source configuration
-def test_delete_datasource(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_delete_datasource(aclient, mock_validate_token, mock_storage_service):
     """Test deleting a data source configuration"""
     # Get a test config ID
-    test_config_id = str(uuid4())
+    test_config_id = TEST_CONFIG_ID
 
     # Send DELETE request to delete a data source
-    response = client.delete(
+    response = await aclient.delete(
         f"/api/v1/datasources/{test_config_id}",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
@@ -352,36 +334,36 @@ def test_delete_datasource(mock_validate_token, mock_storage_service):
 
 
 # Test validating a data source configuration
-def test_validate_datasource(
+@pytest.mark.asyncio
+async def test_validate_datasource(
+    aclient,
     mock_validate_token, mock_storage_service, mock_validation_service
 ):
     """Test validating a data source configuration"""
     # Get a test config ID
-    test_config_id = str(uuid4())
+    test_config_id = TEST_CONFIG_ID
 
     # Send POST request to validate a data source
-    response = client.post(
+    response = await aclient.post(
         f"/api/v1/datasources/{test_config_id}/validate",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
     assert response.status_code == 200
     data = response.json()
-    assert "success" in data
-    assert "message" in data
-    assert "details" in data
-    assert "warnings" in data
+    assert _VALIDATION_KEYS <= data.keys()
     assert data["success"] is True
 
 
 # Test listing data source types
-def test_list_datasource_types(mock_validate_token, mock_registry):
+@pytest.mark.asyncio
+async def test_list_datasource_types(aclient, mock_validate_token, mock_registry):
     """Test listing data source types"""
     # Send GET request to list data source types
-    response = client.get(
+    response = await aclient.get(
         "/api/v1/datasources/types",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Print response for debugging
@@ -401,73 +383,62 @@ def test_list_datasource_types(mock_validate_token, mock_registry):
 
 
 # Test getting a specific data source type
-def test_get_datasource_type(mock_validate_token, mock_registry):
+@pytest.mark.asyncio
+async def test_get_datasource_type(aclient, mock_validate_token, mock_registry):
     """Test getting a specific data source type"""
     # Send GET request to get a specific data source type
-    response = client.get(
+    response = await aclient.get(
         "/api/v1/datasources/types/postgres",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
     assert response.status_code == 200
     data = response.json()
-    assert "type" in data
-    assert "description" in data
-    assert "parameters" in data
+    assert _TYPE_INFO_KEYS <= data.keys()
     assert data["type"] == "postgres"
 
     # Verify the registry method was called with correct parameters
     mock_registry.get_type_info.assert_called_once_with("postgres")
 
 
-# Test authentication requirement
-def test_datasources_auth_required():
-    """Test that datasources endpoints require authentication"""
-    # Try to list data sources without authentication
-    response = client.get("/api/v1/datasources")
-    assert response.status_code == 401
-
-    # Try to create a data source without authentication
-    config_data = {
-        "name": "Test Database",
-        "type": "postgres",
-        "description": "Test database configuration",
-        "host": "localhost",
-        "port": 5432,
-        "database": "testdb",
-    }
-    response = client.post("/api/v1/datasources", json=config_data)
-    assert response.status_code == 401
-
-    # Try to get a data source without authentication
-    test_config_id = str(uuid4())
-    response = client.get(f"/api/v1/datasources/{test_config_id}")
-    assert response.status_code == 401
+# Endpoints that must reject unauthenticated requests, as (method, path, body)
+_AUTH_REQUIRED_CASES = [
+    ("GET", "/api/v1/datasources", None),
+    ("POST", "/api/v1/datasources", _BASE_CONFIG_JSON),
+    ("GET", f"/api/v1/datasources/{TEST_CONFIG_ID}", None),
+    ("PUT", f"/api/v1/datasources/{TEST_CONFIG_ID}", _BASE_CONFIG_JSON),
+    ("DELETE", f"/api/v1/datasources/{TEST_CONFIG_ID}", None),
+    ("POST", f"/api/v1/datasources/{TEST_CONFIG_ID}/validate", None),
+    ("GET", "/api/v1/datasources/types", None),
+    ("GET", "/api/v1/datasources/types/postgres", None),
+]
 
-    # Try to update a data source without authentication
-    response = client.put(f"/api/v1/datasources/{test_config_id}", json=config_data)
-    assert response.status_code == 401
 
-    # Try to delete a data source without authentication
-    response = client.delete(f"/api/v1/datasources/{test_config_id}")
-    assert response.status_code == 401
-
-    # Try to validate a data source without authentication
-    response = client.post(f"/api/v1/datasources/{test_config_id}/validate")
-    assert response.status_code == 401
-
-    # Try to list data source types without authentication
-    response = client.get("/api/v1/datasources/types")
-    assert response.status_code == 401
+# Test authentication requirement
+@pytest.mark.asyncio
+async def test_datasources_auth_required(aclient):
+    """Test that datasources endpoints require authentication"""
+    # The requests are independent, so send them all at once
+    responses = await asyncio.gather(
+        *(
+            aclient.request(method, path, content=body, headers=_JSON_HEADERS)
+            for method, path, body in _AUTH_REQUIRED_CASES
+        )
+    )
 
-    # Try to get a data source type without authentication
-    response = client.get("/api/v1/datasources/types/postgres")
-    assert response.status_code == 401
+    # List the endpoints that let the request through, so a failure names them
+    unprotected = [
+        (method, path, response.status_code)
+        for (method, path, _), response in zip(_AUTH_REQUIRED_CASES, responses)
+        if response.status_code != 401
+    ]
+    assert unprotected == []
 
 
 # Test validation error handling
-def test_create_datasource_validation_error(mock_validate_token):
+@pytest.mark.asyncio
+async def test_create_datasource_validation_error(aclient, mock_validate_token):
     """Test validation error handling when creating a data source"""
     # Prepare invalid request data (missing required fields)
     config_data = {
@@ -477,10 +448,10 @@ def test_create_datasource_validation_error(mock_validate_token):
     }
 
     # Send POST request to create a data source
-    response = client.post(
+    response = await aclient.post(
         "/api/v1/datasources",
         json=config_data,
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response - we're getting a 500 error due to file system issues in the test environment
@@ -494,7 +465,10 @@ def test_create_datasource_validation_error(mock_validate_token):
 
 
 # Test handling non-existent data source
-def test_get_nonexistent_datasource(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_get_nonexistent_datasource(
+    aclient, mock_validate_token, mock_storage_service
+):
     """Test getting a non-existent data source"""
     # Get a test config ID - use a fixed ID that doesn't exist in our mocks
     test_config_id = "00000000-0000-0000-0000-000000000000"
@@ -502,12 +476,11 @@ def test_get_nonexistent_datasource(mock_validate_token, mock_storage_service):
     # Send GET request to get a non-existent data source
     with patch(
         "app.routes.datasources.ConfigurationStorageService.get_config",
-        new_callable=AsyncMock,
-        return_value=None,
+        new=_returning(None),
     ):
-        response = client.get(
+        response = await aclient.get(
             f"/api/v1/datasources/{test_config_id}",
-            headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+            headers=AUTH_HEADERS,
         )
 
         # Check response
@@ -518,15 +491,18 @@ def test_get_nonexistent_datasource(mock_validate_token, mock_storage_service):
 
 
 # Test handling non-existent data source type
-def test_get_nonexistent_datasource_type(mock_validate_token, mock_registry):
+@pytest.mark.asyncio
+async def test_get_nonexistent_datasource_type(
+    aclient, mock_validate_token, mock_registry
+):
     """Test getting a non-existent data source type"""
     # Mock get_type_info to return None
     mock_registry.get_type_info = MagicMock(return_value=None)
 
     # Send GET request to get a non-existent data source type
-    response = client.get(
+    response = await aclient.get(
         "/api/v1/datasources/types/nonexistent",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
@@ -537,42 +513,47 @@ def test_get_nonexistent_datasource_type(mock_validate_token, mock_registry):
 
 
 # Test filtering data sources by type
-def test_list_datasources_with_filter(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_list_datasources_with_filter(
+    aclient, mock_validate_token, mock_storage_service
+):
     """Test listing data sources with type filter"""
     # Send GET request to list data sources with type filter
-    response = client.get(
+    response = await aclient.get(
         "/api/v1/datasources?type=postgres",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
     assert response.status_code == 200
     data = response.json()
-    assert "datasources" in data
-    assert "total" in data
+    assert _DATASOURCE_LIST_KEYS <= data.keys()
 
 
 # Test pagination for data sources list
-def test_list_datasources_with_pagination(mock_validate_token, mock_storage_service):
+@pytest.mark.asyncio
+async def test_list_datasources_with_pagination(
+    aclient, mock_validate_token, mock_storage_service
+):
     """Test listing data sources with pagination"""
     # Send GET request to list data sources with pagination
-    response = client.get(
+    response = await aclient.get(
         "/api/v1/datasources?skip=0&limit=10",
-        headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+        headers=AUTH_HEADERS,
     )
 
     # Check response
     assert response.status_code == 200
     data = response.json()
-    assert "datasources" in data
-    assert "total" in data
+    assert _DATASOURCE_LIST_KEYS <= data.keys()
 
 
 # Test validation failure
-def test_validate_datasource_failure(mock_validate_token):
+@pytest.mark.asyncio
+async def test_validate_datasource_failure(aclient, mock_validate_token):
     """Test validation failure for a data source"""
     # Get a test config ID
-    test_config_id = str(uuid4())
+    test_config_id = TEST_CONFIG_ID
 
     # Create a validation result with failure
     validation_result = ValidationResult(
@@ -585,12 +566,11 @@ def test_validate_datasource_failure(mock_validate_token):
     # Send POST request to validate a data source with patched validation
     with patch(
         "app.routes.datasources.DataSourceValidationService.validate_config",
-        new_callable=AsyncMock,
-        return_value=validation_result,
+        new=_returning(validation_result),
     ):
-        response = client.post(
+        response = await aclient.post(
             f"/api/v1/datasources/{test_config_id}/validate",
-            headers={"Authorization": f"Bearer {TEST_TOKEN}"},
+            headers=AUTH_HEADERS,
         )
 
         # Check response - we're getting a 500 error due to file system issues in the test environment
@@ -603,10 +583,7 @@ def test_validate_datasource_failure(mock_validate_token):
         # If we got a 200 response, check the details
         if response.status_code == 200:
             data = response.json()
-            assert "success" in data
-            assert "message" in data
-            assert "details" in data
-            assert "warnings" in data
+            assert _VALIDATION_KEYS <= data.keys()
             assert data["success"] is False
             assert "Validation failed" in data["message"]
             assert "Connection refused" in data["details"]["error"]
@@ -78,7 +78,7 @@ def mock_rag_instance():
     # Setup the mock RAG manager
     with patch("app.dependencies.get_rag_manager") as mock_get_manager:
         manager = MagicMock()
-        manager.get_instance.return_value = mock_rag
+        manager.aget_instance = AsyncMock(return_value=mock_rag)
         mock_get_manager.return_value = manager
 
         # Patch both search_lightrag and query_lightrag utilities with AsyncMock
@@ -1,11 +1,20 @@
 import pytest
+import asyncio
+import httpx
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
 import jwt
 import time
 from unittest.mock import patch, AsyncMock, MagicMock
 from app.main import app
-from app.utilities.auth import validate_and_decode_token, extract_user_id
+from app.utilities.auth import (
+    validate_and_decode_token,
+    extract_user_id,
+    _JWKSCache,
+    _index_keys,
+    SigningKey,
+    get_key_from_jwks,
+)
 from app.middleware.auth import validate_token, get_token_from_header, AuthError
 
 
@@ -40,22 +49,15 @@ def create_mock_token(sub="123456", expired=False, invalid_signature=False):
 
 
 @pytest.mark.asyncio
-@patch("app.utilities.auth.get_auth0_public_keys")
+@patch("app.utilities.auth.get_signing_keys")
 @patch("app.utilities.auth.get_key_from_jwks")
-@patch("jose.jwt.decode")
-@patch("jose.jwk.construct")
-async def test_validate_and_decode_token(
-    mock_construct, mock_decode, mock_get_key, mock_get_keys
-):
+@patch("jwt.decode")
+async def test_validate_and_decode_token(mock_decode, mock_get_key, mock_get_keys):
     """Test the validate_and_decode_token function"""
     # Mock return values
-    mock_get_keys.return_value = {"keys": [{"kid": "test_kid", "kty": "RSA"}]}
-    mock_get_key.return_value = {"kid": "test_kid", "kty": "RSA", "alg": "RS256"}
-
-    # Mock the JWK construct function
-    mock_pem = MagicMock()
-    mock_pem.to_pem.return_value = b"mock_pem_key"
-    mock_construct.return_value = mock_pem
+    signing_key = SigningKey("mock_public_key", "RS256")
+    mock_get_keys.return_value = {"test_kid": signing_key}
+    mock_get_key.return_value = signing_key
 
     # Mock the JWT decode function
     mock_decode.return_value = {"sub": "123456", "name": "Test User"}
@@ -64,8 +66,9 @@ async def test_validate_and_decode_token(
     token = "valid_token"
     result = await validate_and_decode_token(token)
 
-    # Assert the JWT decode function was called
+    # Assert the JWT decode function was called with the cached key
     mock_decode.assert_called_once()
+    assert mock_decode.call_args.kwargs["key"] == "mock_public_key"
 
     # Check the result
     assert result["sub"] == "123456"
@@ -74,7 +77,7 @@ async def test_validate_and_decode_token(
 
 @pytest.mark.asyncio
 @patch("app.utilities.auth.get_auth0_public_keys")
-@patch("jose.jwt.get_unverified_header")
+@patch("jwt.get_unverified_header")
 async def test_validate_and_decode_token_no_matching_key(
     mock_get_header, mock_get_keys
 ):
@@ -96,6 +99,107 @@ async def test_validate_and_decode_token_no_matching_key(
     assert "Authentication error" in exc_info.value.detail
 
 
+@pytest.mark.asyncio
+async def test_jwks_cache_fetches_once():
+    """Test that concurrent requests for uncached keys share one fetch"""
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(
+            200,
+            json={"keys": [{"kid": "test_kid"}]},
+            headers={"ETag": '"v1"', "Cache-Control": "max-age=600"},
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    cache = _JWKSCache("https://example.com/.well-known/jwks.json")
+    with patch("app.utilities.auth._get_http_client", return_value=client):
+        results = await asyncio.gather(*(cache.get() for _ in range(5)))
+
+    assert len(requests) == 1
+    assert all(result == {"keys": [{"kid": "test_kid"}]} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_jwks_cache_revalidates_with_etag():
+    """Test that expired keys are revalidated and kept on 304 Not Modified"""
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"keys": []}, headers={"ETag": '"v1"'})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    cache = _JWKSCache("https://example.com/.well-known/jwks.json")
+    with patch("app.utilities.auth._get_http_client", return_value=client):
+        first = await cache.get()
+
+        # Expire the keys to force a refresh
+        cache.expires_at = 0
+        second = await cache.get()
+
+    assert len(requests) == 2
+    assert second is first
+    assert cache.expires_at > 0
+
+
+@pytest.mark.asyncio
+async def test_jwks_cache_refreshes_for_unknown_kid():
+    """Test that an unknown kid forces one rate-limited refresh"""
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        keys = {"keys": []} if len(requests) == 1 else {"keys": [{"kid": "new"}]}
+        return httpx.Response(
+            200, json=keys, headers={"Cache-Control": "max-age=600"}
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    cache = _JWKSCache("https://example.com/.well-known/jwks.json")
+    index_keys = lambda jwks: {k["kid"]: SigningKey(None, "RS256") for k in jwks["keys"]}
+    with patch("app.utilities.auth._get_http_client", return_value=client), patch(
+        "app.utilities.auth._index_keys", side_effect=index_keys
+    ):
+        await cache.get()
+
+        # Rotated keys are fetched before the cached ones expire
+        assert await cache.refresh_for_kid("new")
+        assert len(requests) == 2
+
+        # Unknown kids don't trigger another fetch within the interval
+        assert not await cache.refresh_for_kid("made_up")
+        assert len(requests) == 2
+
+
+def test_index_keys_loads_once_by_kid():
+    """Test that JWKS keys are loaded and looked up by kid"""
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = jwt.algorithms.RSAAlgorithm.to_jwk(
+        private_key.public_key(), as_dict=True
+    )
+    keys_by_kid = _index_keys({"keys": [{**public_jwk, "kid": "test_kid"}]})
+
+    assert list(keys_by_kid) == ["test_kid"]
+    assert keys_by_kid["test_kid"].alg == "RS256"
+
+    # Check that a token's kid selects the indexed key, which verifies it
+    token = jwt.encode(
+        {"sub": "123456"}, private_key, algorithm="RS256", headers={"kid": "test_kid"}
+    )
+    signing_key = get_key_from_jwks(token, keys_by_kid)
+    assert signing_key is keys_by_kid["test_kid"]
+    assert jwt.decode(token, key=signing_key.key, algorithms=["RS256"]) == {
+        "sub": "123456"
+    }
+
+
 def test_extract_user_id():
     """Test the extract_user_id function"""
     # Test with a valid payload
@@ -500,6 +500,9 @@ class TestDataSourceValidationService:
             assert result["details"]["tables_count"] == 2
             assert result["details"]["tables"] == ["table1", "table2"]
 
+            # Check that the connection was released
+            mock_conn.close.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_validate_file_access_csv(self, temp_dir):
         """Test validate_file_access method for CSV files"""
@@ -533,6 +536,33 @@ class TestDataSourceValidationService:
         assert result.details["sample_rows"][0] == ["1", "test1", "100"]
         assert result.details["sample_rows"][1] == ["2", "test2", "200"]
 
+    @pytest.mark.asyncio
+    async def test_validate_file_access_csv_sample_truncated(self, temp_dir):
+        """Test that validate_file_access only samples the start of large CSV files"""
+        # Create a CSV file larger than the sample size
+        csv_path = os.path.join(temp_dir, "large.csv")
+        with open(csv_path, "w") as f:
+            f.write("id,name\n")
+            for i in range(100):
+                f.write(f"{i},name{i}\n")
+
+        config = FileDataSource(
+            name="Large CSV",
+            type="csv",
+            path=csv_path,
+        )
+
+        # Shrink the sample so it ends in the middle of a row
+        with patch(
+            "app.services.datasource_validation_service.FILE_SAMPLE_SIZE", 30
+        ):
+            result = await DataSourceValidationService.validate_file_access(config)
+
+        # Only complete rows from the sample are returned
+        assert result.success is True
+        assert result.details["header"] == ["id", "name"]
+        assert result.details["sample_rows"] == [["0", "name0"], ["1", "name1"]]
+
     @pytest.mark.asyncio
     async def test_validate_file_access_json(self, temp_dir):
         """Test validate_file_access method for JSON files"""
@@ -578,7 +608,7 @@ class TestDataSourceValidationService:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.headers = {"content-type": "application/json"}
-        mock_response.json.return_value = {"data": [{"id": 1, "name": "test"}]}
+        mock_response.content = b'{"data": [{"id": 1, "name": "test"}]}'
 
         mock_client = AsyncMock()
         mock_client.__aenter__.return_value.get.return_value = mock_response
@@ -596,6 +626,65 @@ class TestDataSourceValidationService:
             assert result["details"]["response_type"] == "json"
 
 
+    @pytest.mark.asyncio
+    async def test_validate_s3_access_caches_bucket_check(self):
+        """Test that validate_s3_access caches successful bucket existence checks"""
+        config = S3DataSource(
+            name="Test S3",
+            type="s3",
+            bucket="cached-bucket",
+            access_key="test-access-key",
+            secret_key="test-secret-key",
+        )
+
+        # Mock boto3 client
+        mock_s3 = MagicMock()
+        mock_s3.list_objects_v2.return_value = {
+            "KeyCount": 1,
+            "Contents": [{"Key": "file1.csv"}],
+        }
+        mock_boto3 = MagicMock()
+        mock_boto3.client.return_value = mock_s3
+
+        with patch(
+            "app.services.datasource_validation_service.boto3", mock_boto3
+        ), patch(
+            "app.services.datasource_validation_service.ClientError", Exception
+        ), patch.dict(
+            "app.services.datasource_validation_service._S3_BUCKET_CACHE", clear=True
+        ):
+            # Validate twice with the same bucket and credentials
+            first = await DataSourceValidationService.validate_s3_access(config)
+            second = await DataSourceValidationService.validate_s3_access(config)
+
+        # Check the results
+        assert first.success is True
+        assert second.success is True
+        assert first.details["object_count"] == ">=1"
+        assert first.details["sample_objects"] == ["file1.csv"]
+        mock_s3.head_bucket.assert_called_once_with(Bucket="cached-bucket")
+        assert mock_s3.list_objects_v2.call_count == 2
+        assert mock_s3.list_objects_v2.call_args.kwargs["MaxKeys"] == 1
+
+
+    def test_s3_bucket_cache_is_bounded(self):
+        """Test that the bucket cache drops expired entries and stays under its size"""
+        from app.services import datasource_validation_service as service
+
+        with patch.dict(service._S3_BUCKET_CACHE, clear=True), patch.object(
+            service, "S3_BUCKET_CACHE_SIZE", 2
+        ):
+            service._S3_BUCKET_CACHE[("expired", "creds")] = 0.0
+            service._remember_s3_bucket(("bucket1", "creds"))
+            assert list(service._S3_BUCKET_CACHE) == [("bucket1", "creds")]
+
+            service._remember_s3_bucket(("bucket2", "creds"))
+            service._remember_s3_bucket(("bucket3", "creds"))
+            assert list(service._S3_BUCKET_CACHE) == [
+                ("bucket2", "creds"),
+                ("bucket3", "creds"),
+            ]
+
 # Test DataSourceTypeRegistry
 class TestDataSourceTypeRegistry:
     """Tests for DataSourceTypeRegistry"""
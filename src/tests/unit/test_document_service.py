@@ -0,0 +1,178 @@
+"""
+Unit tests for the document service.
+"""
+
+import asyncio
+import io
+import pytest
+from contextlib import nullcontext
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.services.document_service import DocumentService, METADATA_FLUSH_DELAY
+from app.services.ingestion_batcher import IngestionBatcher
+
+
+def make_upload(content: bytes, filename: str = "notes.txt") -> UploadFile:
+    """Create a plain text upload"""
+    return UploadFile(
+        file=io.BytesIO(content),
+        size=len(content),
+        filename=filename,
+        headers=Headers({"content-type": "text/plain"}),
+    )
+
+
+class TestDuplicateUploads:
+    """Tests for skipping ingestion of duplicate uploads"""
+
+    @pytest.fixture
+    def user_id(self, tmp_path):
+        """Create a user whose documents are stored in a temporary directory"""
+        with patch.object(
+            DocumentService, "get_user_docs_dir", return_value=str(tmp_path)
+        ), patch.object(
+            DocumentService,
+            "get_user_meta_path",
+            return_value=str(tmp_path / "metadata.json"),
+        ):
+            yield f"user_{tmp_path.name}"
+
+    @pytest.fixture
+    def batcher(self):
+        """Mock the ingestion batcher"""
+        with patch("app.services.document_service._ingestion_batcher") as mock_batcher:
+            yield mock_batcher
+
+    @pytest.mark.asyncio
+    async def test_duplicate_of_complete_document_skips_ingestion(
+        self, user_id, batcher
+    ):
+        """Test that re-uploading ingested content is not ingested again"""
+        original = await DocumentService.upload_document(
+            user_id, make_upload(b"same content"), "Original"
+        )
+        await DocumentService._set_doc_status(user_id, original["id"], "complete")
+
+        duplicate = await DocumentService.upload_document(
+            user_id, make_upload(b"same content"), "Duplicate"
+        )
+        await DocumentService.flush_metadata(user_id)
+
+        assert duplicate["status"] == "complete"
+        assert batcher.submit.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_of_in_flight_document_is_ingested(
+        self, user_id, batcher
+    ):
+        """Test that a duplicate of a document still processing is ingested itself"""
+        original = await DocumentService.upload_document(
+            user_id, make_upload(b"same content"), "Original"
+        )
+        duplicate = await DocumentService.upload_document(
+            user_id, make_upload(b"same content"), "Duplicate"
+        )
+
+        assert duplicate["status"] == "processing"
+        assert batcher.submit.call_count == 2
+
+        # The original's ingestion fails after the duplicate was uploaded
+        rag_manager = MagicMock()
+        rag_manager.in_use.return_value = nullcontext()
+        rag_manager.aget_instance = AsyncMock()
+        original_job = batcher.submit.call_args_list[0].args[1]
+        with patch(
+            "app.services.document_service.get_rag_manager", return_value=rag_manager
+        ), patch(
+            "app.services.document_service.ingest_documents",
+            AsyncMock(side_effect=RuntimeError("embedding failed")),
+        ):
+            await DocumentService._process_documents(user_id, [original_job])
+        await DocumentService.flush_metadata(user_id)
+
+        original_meta = await DocumentService.get_doc_metadata(user_id, original["id"])
+        duplicate_meta = await DocumentService.get_doc_metadata(
+            user_id, duplicate["id"]
+        )
+        assert original_meta["status"] == "failed"
+        assert duplicate_meta["status"] == "processing"
+
+
+class TestMetadataFlush:
+    """Tests for writing cached metadata to disk"""
+
+    @pytest.fixture
+    def user_id(self, tmp_path):
+        """Create a user whose metadata is stored in a temporary directory"""
+        with patch.object(
+            DocumentService,
+            "get_user_meta_path",
+            return_value=str(tmp_path / "metadata.json"),
+        ):
+            yield f"user_{tmp_path.name}"
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_retried(self, user_id, tmp_path):
+        """Test that changes stay pending when writing them fails"""
+        with patch.object(
+            DocumentService,
+            "_write_metadata_file",
+            side_effect=OSError("disk full"),
+        ):
+            await DocumentService.save_metadata(user_id, {"doc1": {"id": "doc1"}})
+            await DocumentService.flush_metadata(user_id)
+
+        await DocumentService.flush_metadata(user_id)
+
+        assert (tmp_path / "metadata.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_drop_cancels_pending_flush(self, user_id, tmp_path):
+        """Test that dropped metadata is never written over the file on disk"""
+        meta_path = tmp_path / "metadata.json"
+        await DocumentService.save_metadata(user_id, {"doc1": {"id": "doc1"}})
+
+        # e.g. a backup restore replaces the file before the flush runs
+        meta_path.write_bytes(b"{}")
+        await DocumentService.drop_cached_metadata(user_id)
+        await asyncio.sleep(METADATA_FLUSH_DELAY * 2)
+
+        assert meta_path.read_bytes() == b"{}"
+        assert await DocumentService.load_metadata(user_id) == {}
+
+
+class TestStopIngestion:
+    """Tests for stopping ingestion at shutdown"""
+
+    @pytest.mark.asyncio
+    async def test_queued_batches_finish_before_stopping(self):
+        """Test that queued jobs are processed before the workers stop"""
+        processed = []
+
+        async def process_batch(user_id, jobs):
+            await asyncio.sleep(0.01)
+            processed.extend(jobs)
+
+        batcher = IngestionBatcher(process_batch, wait_timeout=0.01)
+        with patch("app.services.document_service._ingestion_batcher", batcher):
+            batcher.submit("user1", "doc1")
+            batcher.submit("user2", "doc2")
+
+            await DocumentService.stop_ingestion()
+
+        assert sorted(processed) == ["doc1", "doc2"]
+        assert batcher._workers == []
+
+    @pytest.mark.asyncio
+    async def test_stops_after_timeout(self):
+        """Test that a batch still running at the timeout is cancelled"""
+        batcher = IngestionBatcher(lambda user_id, jobs: asyncio.sleep(10))
+        with patch("app.services.document_service._ingestion_batcher", batcher):
+            batcher.submit("user1", "doc1")
+
+            await DocumentService.stop_ingestion(timeout=0.01)
+
+        assert batcher._workers == []
@@ -0,0 +1,88 @@
+"""
+Unit tests for the embedding batcher.
+"""
+
+import pytest
+import asyncio
+
+import numpy as np
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class TestEmbeddingBatcher:
+    """Tests for EmbeddingBatcher class"""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_calls(self):
+        """Test that concurrent calls share one request and get their own rows"""
+        requests = []
+
+        async def embed(texts):
+            requests.append(texts)
+            return np.array([[float(len(text))] for text in texts])
+
+        batcher = EmbeddingBatcher(embed, wait_timeout=0.01)
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["bb", "ccc"]), batcher.embed(["dddd"])
+        )
+        await batcher.stop()
+
+        # Check that a single request was made
+        assert requests == [["a", "bb", "ccc", "dddd"]]
+
+        # Check that each caller got the rows for its own texts
+        assert [result.tolist() for result in results] == [
+            [[1.0]],
+            [[2.0], [3.0]],
+            [[4.0]],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_splits_batches_at_batch_size(self):
+        """Test that calls beyond the batch size go into the next request"""
+        requests = []
+
+        async def embed(texts):
+            requests.append(texts)
+            return np.zeros((len(texts), 2))
+
+        batcher = EmbeddingBatcher(embed, batch_size=2, wait_timeout=0.01)
+        await asyncio.gather(*(batcher.embed([str(i)]) for i in range(5)))
+        await batcher.stop()
+
+        assert requests == [["0", "1"], ["2", "3"], ["4"]]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test that a failed request raises in every call it contained"""
+
+        async def embed(texts):
+            raise RuntimeError("rate limited")
+
+        batcher = EmbeddingBatcher(embed, wait_timeout=0.01)
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True
+        )
+        await batcher.stop()
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_in_flight_requests(self):
+        """Test that stopping cancels sent requests and their callers"""
+        started = asyncio.Event()
+
+        async def embed(texts):
+            started.set()
+            await asyncio.sleep(10)
+
+        batcher = EmbeddingBatcher(embed, wait_timeout=0.01)
+        call = asyncio.create_task(batcher.embed(["a"]))
+        await started.wait()
+
+        await batcher.stop()
+
+        assert not batcher._in_flight
+        with pytest.raises(asyncio.CancelledError):
+            await call
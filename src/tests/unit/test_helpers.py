@@ -0,0 +1,54 @@
+"""
+Unit tests for the helper utilities.
+"""
+
+import os
+import uuid
+import pytest
+
+from app.utilities import helpers
+from app.utilities.helpers import acreate_temp_file, create_temp_file, generate_id
+
+
+class TestCreateTempFile:
+    """Tests for create_temp_file and acreate_temp_file"""
+
+    def test_writes_content(self):
+        """Test that the file holds the given content"""
+        path = create_temp_file(b"hello", prefix="test_", suffix=".txt")
+        try:
+            assert os.path.basename(path).startswith("test_")
+            assert path.endswith(".txt")
+            with open(path, "rb") as f:
+                assert f.read() == b"hello"
+        finally:
+            os.remove(path)
+
+    @pytest.mark.asyncio
+    async def test_async_writes_large_content_in_chunks(self, monkeypatch):
+        """Test that content over the chunking threshold is written in full"""
+        monkeypatch.setattr(helpers, "LARGE_WRITE_SIZE", 10)
+        monkeypatch.setattr(helpers, "WRITE_CHUNK_SIZE", 4)
+        content = bytes(range(25))
+
+        path = await acreate_temp_file(content)
+        try:
+            with open(path, "rb") as f:
+                assert f.read() == content
+        finally:
+            os.remove(path)
+
+
+class TestGenerateId:
+    """Tests for generate_id"""
+
+    def test_ids_are_unique_uuid4(self):
+        """Test that IDs are distinct version 4 UUIDs across pool refills"""
+        ids = [generate_id() for _ in range(200)]
+
+        assert len(set(ids)) == len(ids)
+        for id_ in ids:
+            parsed = uuid.UUID(id_)
+            assert str(parsed) == id_
+            assert parsed.version == 4
+            assert parsed.variant == uuid.RFC_4122
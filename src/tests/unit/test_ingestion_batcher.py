@@ -0,0 +1,97 @@
+"""
+Unit tests for the ingestion batcher.
+"""
+
+import pytest
+import asyncio
+
+from app.services.ingestion_batcher import IngestionBatcher
+
+
+class TestIngestionBatcher:
+    """Tests for IngestionBatcher class"""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_jobs_into_batches(self):
+        """Test that jobs submitted together are processed as batches"""
+        batches = []
+
+        async def process_batch(user_id, jobs):
+            batches.append((user_id, jobs))
+
+        batcher = IngestionBatcher(process_batch, batch_size=3, wait_timeout=0.01)
+
+        # Submit more jobs than fit in one batch
+        for i in range(5):
+            batcher.submit("user1", i)
+
+        # Wait for the workers to drain the queue
+        await batcher.join()
+        await batcher.stop()
+
+        # Check the batches
+        assert batches == [("user1", [0, 1, 2]), ("user1", [3, 4])]
+
+    @pytest.mark.asyncio
+    async def test_batches_are_per_user(self):
+        """Test that jobs from different users are never mixed"""
+        batches = []
+
+        async def process_batch(user_id, jobs):
+            batches.append((user_id, jobs))
+
+        batcher = IngestionBatcher(process_batch, batch_size=10, wait_timeout=0.01)
+        batcher.submit("user1", "a")
+        batcher.submit("user2", "b")
+        batcher.submit("user1", "c")
+
+        await batcher.join()
+        await batcher.stop()
+
+        # Check the batches
+        assert sorted(batches) == [("user1", ["a", "c"]), ("user2", ["b"])]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_stop_worker(self):
+        """Test that an error in one batch doesn't drop later batches"""
+        batches = []
+
+        async def process_batch(user_id, jobs):
+            batches.append(jobs)
+            if len(batches) == 1:
+                raise RuntimeError("ingestion failed")
+
+        batcher = IngestionBatcher(process_batch, batch_size=1, wait_timeout=0.01)
+        batcher.submit("user1", 1)
+        batcher.submit("user1", 2)
+
+        await batcher.join()
+        await batcher.stop()
+
+        # Check that both batches were attempted
+        assert batches == [[1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_worker_pool_bounds_concurrency(self):
+        """Test that no more than max_workers batches run at once"""
+        running = 0
+        peak = 0
+
+        async def process_batch(user_id, jobs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        batcher = IngestionBatcher(
+            process_batch, batch_size=1, wait_timeout=0, max_workers=2
+        )
+        for i in range(6):
+            batcher.submit(f"user{i}", i)
+
+        await batcher.join()
+        await batcher.stop()
+
+        # Check that the pool limit was reached but never exceeded
+        assert peak == 2
@@ -0,0 +1,51 @@
+"""
+Unit tests for the LightRAG utilities.
+"""
+
+import pytest
+from unittest.mock import create_autospec
+
+from app.utilities.lightrag_utils import (
+    LightRAG,
+    ingest_document,
+    ingest_documents,
+    ingest_text,
+)
+
+
+@pytest.fixture
+def rag():
+    """Create a mock with LightRAG's real method signatures"""
+    return create_autospec(LightRAG, instance=True)
+
+
+class TestIngestion:
+    """Tests that ingestion only passes arguments LightRAG accepts"""
+
+    @pytest.mark.asyncio
+    async def test_ingest_documents(self, rag):
+        """Test that a batch is inserted in one call"""
+        await ingest_documents(rag, ["one", "two"], ["doc1", "doc2"], ["a", "b"])
+
+        rag.ainsert.assert_awaited_once_with(
+            ["one", "two"], ids=["doc1", "doc2"], file_paths=["a", "b"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_ingest_document(self, rag):
+        """Test that a single document is inserted"""
+        await ingest_document(rag, "content", "doc1", "a")
+
+        rag.ainsert.assert_awaited_once_with(
+            "content", ids=["doc1"], file_paths=["a"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_ingest_text(self, rag):
+        """Test that text is inserted under a virtual file path"""
+        result = await ingest_text(rag, "content", "text1", "Title", {"k": "v"})
+
+        rag.ainsert.assert_awaited_once_with(
+            "content", ids=["text1"], file_paths=["text_text1"]
+        )
+        assert result["status"] == "complete"
@@ -0,0 +1,128 @@
+"""
+Unit tests for the LRU RAG instance manager.
+"""
+
+import pytest
+import asyncio
+import tempfile
+
+from app.services.rag_manager import LRURAGManager
+
+
+class FakeLRURAGManager(LRURAGManager):
+    """LRURAGManager that stores placeholder objects instead of LightRAG instances"""
+
+    builds = 0
+
+    async def create_instance_async(self, user_id: str):
+        self.builds += 1
+        await asyncio.sleep(0.01)
+        rag = object()
+        self.instances[user_id] = rag
+        return rag
+
+
+class TestLRURAGManager:
+    """Tests for LRURAGManager class"""
+
+    @pytest.fixture
+    def manager(self):
+        """Create a manager that holds at most two instances"""
+        return FakeLRURAGManager(tempfile.mkdtemp(), "", max_instances=2)
+
+    def test_returns_cached_instance(self, manager):
+        """Test that a second lookup returns the same instance"""
+        first = manager.get_instance("user1")
+
+        assert manager.get_instance("user1") is first
+        assert manager.cache_stats()["hits"] == 1
+        assert manager.cache_stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self, manager):
+        """Test that the least recently used instance is evicted at capacity"""
+        manager.get_instance("user1")
+        manager.get_instance("user2")
+
+        # Touch user1 so user2 becomes the least recently used
+        manager.get_instance("user1")
+        manager.get_instance("user3")
+
+        assert list(manager.instances) == ["user1", "user3"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_requests_build_once(self, manager):
+        """Test that concurrent lookups for a new user share a single build"""
+        results = await asyncio.gather(
+            *(manager.aget_instance("user1") for _ in range(5))
+        )
+        await manager.stop()
+
+        assert manager.builds == 1
+        assert all(rag is results[0] for rag in results)
+        assert manager._build_locks == {}
+
+    def test_skips_instances_in_use(self, manager):
+        """Test that an instance in use is not evicted even if it scores highest"""
+        manager.get_instance("user1")
+        manager.get_instance("user2")
+
+        # Touch user2 so user1 becomes the preferred victim
+        manager.get_instance("user2")
+        with manager.in_use("user1"):
+            manager.get_instance("user3")
+
+        assert list(manager.instances) == ["user1", "user3"]
+        assert manager._in_use == {}
+
+    def test_exceeds_capacity_when_all_in_use(self, manager):
+        """Test that a new instance is still created when every instance is busy"""
+        manager.get_instance("user1")
+        manager.get_instance("user2")
+
+        with manager.in_use("user1"), manager.in_use("user2"):
+            manager.get_instance("user3")
+
+        assert list(manager.instances) == ["user1", "user2", "user3"]
+
+    @pytest.mark.asyncio
+    async def test_sync_get_instance_rejects_running_loop(self, manager):
+        """Test that the sync shim refuses to start a second event loop"""
+        with pytest.raises(RuntimeError):
+            manager.get_instance("user1")
+
+        assert manager.builds == 0
+
+    def test_evict_idle_instances(self):
+        """Test that only instances idle past the TTL and not in use are evicted"""
+        manager = FakeLRURAGManager(tempfile.mkdtemp(), "", max_instances=3)
+        manager.get_instance("user1")
+        manager.get_instance("user2")
+        manager.get_instance("user3")
+        manager.stats["user1"].last_access -= 1000
+        manager.stats["user2"].last_access -= 1000
+
+        with manager.in_use("user2"):
+            evicted = manager.evict_idle(max_idle=900)
+
+        assert evicted == ["user1"]
+        assert list(manager.instances) == ["user2", "user3"]
+        assert "user1" not in manager.stats
+
+    def test_sizes_measured_before_eviction_and_refreshed(self, manager, tmp_path):
+        """Test that sizes are measured off the loop and can be refreshed"""
+        manager.base_dir = str(tmp_path)
+        (tmp_path / "user1").mkdir()
+        (tmp_path / "user1" / "data").write_bytes(b"x" * 10)
+        manager.get_instance("user1")
+        manager.get_instance("user2")
+
+        # Eviction measures every unmeasured instance first
+        manager.get_instance("user3")
+        assert list(manager.instances) == ["user2", "user3"]
+        assert manager.stats["user2"].size_bytes == 0
+        assert manager.stats["user3"].size_bytes is None
+
+        (tmp_path / "user3").mkdir()
+        (tmp_path / "user3" / "data").write_bytes(b"x" * 20)
+        asyncio.run(manager.refresh_size("user3"))
+        assert manager.stats["user3"].size_bytes == 20
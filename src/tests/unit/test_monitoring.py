@@ -179,6 +179,38 @@ class TestLightRAGMonitor:
         assert metrics["insert"]["count"] == 1
         assert metrics["insert"]["avg_time"] == 0.4
 
+    def test_get_metrics_postgres_pool(self):
+        """Test that get_metrics reports the shared PostgreSQL pool usage"""
+        monitor = LightRAGMonitor()
+        pool = MagicMock()
+        pool.get_size.return_value = 8
+        pool.get_idle_size.return_value = 3
+        pool.get_min_size.return_value = 1
+        pool.get_max_size.return_value = 12
+        client_manager = MagicMock()
+        client_manager._instances = {"db": MagicMock(pool=pool), "ref_count": 4}
+
+        with patch("app.monitoring.lightrag_monitor.ClientManager", client_manager):
+            metrics = monitor.get_metrics()
+
+        assert metrics["postgres_pool"] == {
+            "size": 8,
+            "idle": 3,
+            "in_use": 5,
+            "min_size": 1,
+            "max_size": 12,
+            "clients": 4,
+        }
+
+        # No pool before the first storage connects
+        client_manager._instances = {"db": None, "ref_count": 0}
+        with patch("app.monitoring.lightrag_monitor.ClientManager", client_manager):
+            assert monitor.get_metrics()["postgres_pool"] is None
+
+        # Nor when LightRAG keeps its clients elsewhere
+        with patch("app.monitoring.lightrag_monitor.ClientManager", object()):
+            assert monitor.get_metrics()["postgres_pool"] is None
+
     def test_reset_metrics(self):
         """Test reset_metrics method"""
         monitor = LightRAGMonitor()
@@ -0,0 +1,121 @@
+"""
+Unit tests for the semantic query cache.
+"""
+
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+
+from app.utilities.lightrag_utils import query_lightrag
+from app.utilities.semantic_cache import SemanticQueryCache, invalidate_query_cache
+
+
+def unit(*values):
+    """Build an L2-normalized float32 vector"""
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeRAG:
+    """LightRAG stand-in with a deterministic embedding per query"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.queries = []
+        self.embedded = []
+
+    async def embedding_func(self, texts):
+        self.embedded.extend(texts)
+        return np.array([self.embeddings[text] for text in texts])
+
+    async def aquery(self, query, param=None):
+        self.queries.append(query)
+        return f"answer to {query}"
+
+
+class TestSemanticQueryCache:
+    """Tests for SemanticQueryCache class"""
+
+    def test_matches_same_text_without_embedding(self):
+        """Test that a query with the same normalized text hits"""
+        cache = SemanticQueryCache()
+        cache.put("What is  RAG?", "cached")
+
+        assert cache.get("what is rag?") == "cached"
+        assert cache.get("what is a rag?") is None
+
+    def test_matches_similar_queries_only(self):
+        """Test that only embeddings above the threshold hit"""
+        cache = SemanticQueryCache(threshold=0.97)
+        cache.put("how does rag work?", "cached", unit(1, 0, 0))
+
+        assert cache.get("how does rag work", unit(1, 0.05, 0)) == "cached"
+        assert cache.get("what is an index?", unit(1, 1, 0)) is None
+
+    def test_similar_query_with_other_literals_misses(self):
+        """Test that queries differing in a number or name don't share results"""
+        cache = SemanticQueryCache()
+        cache.put("revenue in 2023 for Acme", "cached", unit(1, 0, 0))
+
+        assert cache.get("Revenue in 2023 for Acme?", unit(1, 0, 0)) == "cached"
+        assert cache.get("revenue in 2024 for Acme", unit(1, 0, 0)) is None
+        assert cache.get("revenue in 2023 for Globex", unit(1, 0, 0)) is None
+
+    def test_evicts_unused_entry_when_full(self):
+        """Test that a reused entry survives eviction over an unused one"""
+        cache = SemanticQueryCache(capacity=2)
+        cache.put("reused", "reused")
+        cache.put("unused", "unused")
+        assert cache.get("reused") == "reused"
+
+        cache.put("new", "new")
+
+        assert cache.get("reused") == "reused"
+        assert cache.get("unused") is None
+        assert cache.get("new") == "new"
+
+
+@pytest.mark.asyncio
+async def test_query_lightrag_serves_repeated_queries_from_cache():
+    """Test that a repeated query skips LightRAG until the data changes"""
+    rag = FakeRAG({})
+
+    first = await query_lightrag(rag, "what is rag?")
+    assert await query_lightrag(rag, "What is  RAG?") == first
+    await query_lightrag(rag, "who am i?")
+    assert rag.queries == ["what is rag?", "who am i?"]
+
+    # Different parameters don't share results
+    await query_lightrag(rag, "what is rag?", mode="naive")
+    assert len(rag.queries) == 3
+
+    # New data invalidates cached answers
+    invalidate_query_cache(rag)
+    await query_lightrag(rag, "what is rag?")
+    assert len(rag.queries) == 4
+
+
+@pytest.mark.asyncio
+async def test_query_lightrag_embeds_only_for_semantic_cache():
+    """Test that queries are only embedded for the cache when opted in"""
+    rag = FakeRAG(
+        {
+            "what is rag?": [1.0, 0.0, 0.0],
+            "what's rag?": [1.0, 0.01, 0.0],
+        }
+    )
+
+    await query_lightrag(rag, "what is rag?")
+    assert rag.embedded == []
+
+    with patch("app.utilities.lightrag_utils.SEMANTIC_CACHE_ENABLED", True):
+        invalidate_query_cache(rag)
+        first = await query_lightrag(rag, "what is rag?")
+        assert await query_lightrag(rag, "what's rag?") == first
+
+        # Repeating the text hits without embedding it again
+        await query_lightrag(rag, "what is rag?")
+
+    assert rag.embedded == ["what is rag?", "what's rag?"]
+    assert rag.queries == ["what is rag?", "what is rag?"]